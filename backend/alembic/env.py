@@ -28,6 +28,9 @@ os.environ["ENVIRONMENT"] = "development"
 
 # Import models first to register them with SQLModel
 from src.models.entities.user import User
+from src.models.entities.user_archive import UserArchive
+from src.models.entities.idempotency_key import IdempotencyKey
+from src.models.entities.cache_generation import CacheGeneration
 from sqlmodel import SQLModel
 
 # Set target metadata for autogenerate support
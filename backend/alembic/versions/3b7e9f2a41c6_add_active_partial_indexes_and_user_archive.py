@@ -0,0 +1,62 @@
+"""add_active_partial_indexes_and_user_archive
+
+Revision ID: 3b7e9f2a41c6
+Revises: 7c3c4aef5a5f
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7e9f2a41c6'
+down_revision: Union[str, Sequence[str], None] = '7c3c4aef5a5f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Partial indexes covering only active users (soft-deleted rows excluded)
+    op.create_index('ix_user_active_email', 'user', ['email'], unique=False,
+                    postgresql_where=sa.text('is_active'))
+    op.create_index('ix_user_active_auth0_id', 'user', ['auth0_id'], unique=False,
+                    postgresql_where=sa.text('is_active'))
+    op.create_index('ix_user_active_created_at_id', 'user', ['created_at', 'id'], unique=False,
+                    postgresql_where=sa.text('is_active'))
+    
+    # Partial index used by the archival job to find long-inactive users
+    op.create_index('ix_user_inactive_updated_at', 'user', ['updated_at'], unique=False,
+                    postgresql_where=sa.text('NOT is_active'))
+    
+    # Archive table for long-inactive users
+    op.create_table('user_archive',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('email', sa.String(), nullable=False),
+    sa.Column('username', sa.String(), nullable=True),
+    sa.Column('first_name', sa.String(), nullable=True),
+    sa.Column('last_name', sa.String(), nullable=True),
+    sa.Column('auth0_id', sa.String(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_user_archive_email'), 'user_archive', ['email'], unique=False)
+    op.create_index(op.f('ix_user_archive_auth0_id'), 'user_archive', ['auth0_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_user_archive_auth0_id'), table_name='user_archive')
+    op.drop_index(op.f('ix_user_archive_email'), table_name='user_archive')
+    op.drop_table('user_archive')
+    
+    op.drop_index('ix_user_inactive_updated_at', table_name='user')
+    op.drop_index('ix_user_active_created_at_id', table_name='user')
+    op.drop_index('ix_user_active_auth0_id', table_name='user')
+    op.drop_index('ix_user_active_email', table_name='user')
@@ -0,0 +1,29 @@
+"""add_user_updated_at_id_index
+
+Revision ID: a41d0c7e5b93
+Revises: 3b7e9f2a41c6
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41d0c7e5b93'
+down_revision: Union[str, Sequence[str], None] = '3b7e9f2a41c6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Ordering key for the GET /users/changes feed (includes inactive users)
+    op.create_index('ix_user_updated_at_id', 'user', ['updated_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_updated_at_id', table_name='user')
@@ -0,0 +1,35 @@
+"""add_user_inactive_updated_at_id_index
+
+Revision ID: a8e3d6f1c5b7
+Revises: f2a7c4e9b1d3
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8e3d6f1c5b7'
+down_revision: Union[str, Sequence[str], None] = 'f2a7c4e9b1d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Inactive listings page by (updated_at, id); the id tie-breaker makes the
+    # index serve the full ORDER BY. It replaces the updated_at-only index,
+    # which the archival job can use through the same prefix.
+    op.create_index('ix_user_inactive_updated_at_id', 'user', ['updated_at', 'id'], unique=False,
+                    postgresql_where=sa.text('NOT is_active'), sqlite_where=sa.text('NOT is_active'))
+    op.drop_index('ix_user_inactive_updated_at', table_name='user')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_user_inactive_updated_at', 'user', ['updated_at'], unique=False,
+                    postgresql_where=sa.text('NOT is_active'), sqlite_where=sa.text('NOT is_active'))
+    op.drop_index('ix_user_inactive_updated_at_id', table_name='user')
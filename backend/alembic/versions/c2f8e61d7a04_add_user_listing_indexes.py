@@ -0,0 +1,40 @@
+"""add_user_listing_indexes
+
+Revision ID: c2f8e61d7a04
+Revises: a41d0c7e5b93
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2f8e61d7a04'
+down_revision: Union[str, Sequence[str], None] = 'a41d0c7e5b93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Sorting by created_at across active and inactive users
+    op.create_index('ix_user_created_at_id', 'user', ['created_at', 'id'], unique=False)
+    
+    # Sorting/filtering active users by updated_at
+    op.create_index('ix_user_active_updated_at_id', 'user', ['updated_at', 'id'], unique=False,
+                    postgresql_where=sa.text('is_active'))
+    
+    # email_domain filter on active users, ordered by created_at
+    op.create_index('ix_user_active_email_domain_created_at_id', 'user',
+                    [sa.text("lower(split_part(email, '@', 2))"), 'created_at', 'id'], unique=False,
+                    postgresql_where=sa.text('is_active'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_active_email_domain_created_at_id', table_name='user')
+    op.drop_index('ix_user_active_updated_at_id', table_name='user')
+    op.drop_index('ix_user_created_at_id', table_name='user')
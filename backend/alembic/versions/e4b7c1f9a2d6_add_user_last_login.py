@@ -0,0 +1,30 @@
+"""add_user_last_login
+
+Revision ID: e4b7c1f9a2d6
+Revises: d9a3b5c8e217
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b7c1f9a2d6'
+down_revision: Union[str, Sequence[str], None] = 'd9a3b5c8e217'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('user', sa.Column('last_login', sa.DateTime(), nullable=True))
+    op.add_column('user_archive', sa.Column('last_login', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('user_archive', 'last_login')
+    op.drop_column('user', 'last_login')
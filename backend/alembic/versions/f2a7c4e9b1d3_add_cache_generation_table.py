@@ -0,0 +1,33 @@
+"""add_cache_generation_table
+
+Revision ID: f2a7c4e9b1d3
+Revises: e4b7c1f9a2d6
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a7c4e9b1d3'
+down_revision: Union[str, Sequence[str], None] = 'e4b7c1f9a2d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    cache_generation = op.create_table('cache_generation',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('generation', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.bulk_insert(cache_generation, [{'name': 'user', 'generation': 0}])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('cache_generation')
@@ -1,6 +1,10 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
 from contextlib import asynccontextmanager
+import anyio
+import logging
 import os
 from dotenv import load_dotenv
 
@@ -8,20 +12,54 @@ from dotenv import load_dotenv
 from src.core.config.database import create_db_and_tables, engine
 from src.core.config.production import ProductionConfig
 from src.core.config.development import DevelopmentConfig
+from src.core.middleware.deadline import DeadlineMiddleware, RequestDeadlineExceeded, get_request_deadline
+from src.core.middleware.admission import AdmissionController, AdmissionControlMiddleware
+from src.core.middleware.draining import DrainingMiddleware, drain_state
+from src.core.structured_logging import configure_logging, shutdown_logging, RequestContextMiddleware
+from src.core.metrics import metrics
+from src.core.profiling import ProfileStore, StackSampler, ProfilingMiddleware, install_profiling_hooks, instrument_routes
+from src.services.user_write_behind import UserWriteBehind
+from src.services.user_page_cache import user_generation, user_pages
 
 # Import routes
-from src.routes import user_routes
+from src.routes import user_routes, admin_routes
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan event handler for startup and shutdown"""
     # Startup
+    drain_state.reset()
     create_db_and_tables()
+    if config.USER_WRITE_BEHIND_ENABLED:
+        app.state.user_write_behind = UserWriteBehind(
+            engine,
+            flush_size=config.USER_WRITE_BEHIND_FLUSH_SIZE,
+            flush_interval=config.USER_WRITE_BEHIND_FLUSH_INTERVAL_SECONDS,
+            max_pending=config.USER_WRITE_BEHIND_MAX_PENDING,
+        )
+        app.state.user_write_behind.start()
     yield
-    # Shutdown
-    pass
+    # Shutdown: stop taking requests, let in-flight ones finish, flush
+    # background work, then close pooled connections before logging goes away
+    drain_state.begin_draining()
+    logger.info("Draining", extra={"in_flight": drain_state.in_flight})
+    if not await drain_state.wait_idle(config.SHUTDOWN_GRACE_SECONDS):
+        logger.warning(
+            "Grace period expired with requests still in flight",
+            extra={"in_flight": drain_state.in_flight},
+        )
+    write_behind = getattr(app.state, "user_write_behind", None)
+    if write_behind is not None:
+        # Joins the writer thread and flushes; keep it off the event loop
+        await anyio.to_thread.run_sync(write_behind.stop)
+        app.state.user_write_behind = None
+    engine.dispose()
+    logger.info("Shutdown complete")
+    shutdown_logging()
 
 app = FastAPI(
     title="UI AI Agent API",
@@ -37,6 +75,36 @@ if ENVIRONMENT.lower() == "production":
 else:
     config = DevelopmentConfig()
 
+# Structured JSON logs, written by a background thread
+configure_logging(level=config.LOG_LEVEL, queue_size=config.LOG_QUEUE_SIZE)
+
+# Per-route request deadlines; added before CORS so timeout responses
+# still carry CORS headers
+app.add_middleware(
+    DeadlineMiddleware,
+    default_seconds=config.REQUEST_DEADLINE_SECONDS,
+    route_seconds=config.ROUTE_DEADLINES,
+)
+
+# Admission control in front of the deadline so shed requests never start
+# a deadline or touch the threadpool
+admission = AdmissionController(
+    target_latency_seconds=config.ADMISSION_TARGET_DB_LATENCY_MS / 1000,
+    class_limits=config.ADMISSION_CLASS_LIMITS,
+)
+if config.ADMISSION_CONTROL_ENABLED:
+    app.add_middleware(AdmissionControlMiddleware, controller=admission)
+    metrics.register("admission", admission.snapshot)
+
+# Once shutdown starts, new requests get 503 while in-flight ones finish;
+# inside CORS so browsers can read the rejection
+app.add_middleware(DrainingMiddleware, state=drain_state)
+metrics.register("draining", drain_state.snapshot)
+
+# Cached GET /users/ pages, invalidated by the user table's write counter
+user_generation.shared = config.USER_PAGE_CACHE_SHARED_GENERATIONS
+user_pages.max_bytes = config.USER_PAGE_CACHE_MAX_BYTES if config.USER_PAGE_CACHE_ENABLED else 0
+
 # Get CORS origins
 cors_origins = config.get_cors_origins()
 
@@ -50,8 +118,47 @@ app.add_middleware(
     max_age=86400,  # Cache preflight requests for 24 hours
 )
 
+# On-demand profiling; nothing is installed unless it is enabled
+if config.PROFILING_ENABLED:
+    app.state.profile_store = ProfileStore(config.PROFILING_MAX_PROFILES)
+    install_profiling_hooks(engine)
+    app.add_middleware(
+        ProfilingMiddleware,
+        store=app.state.profile_store,
+        sampler=StackSampler(config.PROFILING_INTERVAL_MS / 1000),
+        admin_token=config.ADMIN_TOKEN,
+        sample_rate=config.PROFILING_SAMPLE_RATE,
+    )
+
+# Outermost: correlation ID and sampling decision for everything below
+app.add_middleware(RequestContextMiddleware, sample_rates=config.LOG_SAMPLE_RATES)
+
 # Include routers
 app.include_router(user_routes.router)
+app.include_router(admin_routes.router)
+if config.PROFILING_ENABLED:
+    instrument_routes(app)
+
+# Database overload and deadline errors
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request: Request, exc: PoolTimeoutError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Database is busy, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
+@app.exception_handler(RequestDeadlineExceeded)
+async def deadline_exceeded_handler(request: Request, exc: RequestDeadlineExceeded):
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+@app.exception_handler(OperationalError)
+async def operational_error_handler(request: Request, exc: OperationalError):
+    deadline = get_request_deadline()
+    if deadline is not None and deadline.expired:
+        # Query cancelled by statement_timeout or by the deadline itself
+        return JSONResponse(status_code=504, content={"detail": "Request deadline exceeded"})
+    return JSONResponse(status_code=500, content={"detail": "Internal server error"})
 
 # Basic endpoints for health and root
 @app.get("/")
@@ -62,6 +169,11 @@ def read_root():
 def health_check():
     return {"status": "healthy", "environment": ENVIRONMENT}
 
+@app.get("/ready")
+def readiness_check():
+    """Readiness probe; answered with 503 by DrainingMiddleware once shutdown starts"""
+    return {"status": "ready"}
+
 # Add server startup code
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+"""Archive long-inactive users.
+
+Moves users that were soft-deleted (is_active = false) more than N days ago
+from the user table into user_archive, in chunks.
+
+Usage (from the backend directory):
+    poetry run python scripts/archive_inactive_users.py [--days 90] [--chunk-size 500]
+"""
+import argparse
+import os
+import sys
+
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+load_dotenv()
+
+from sqlmodel import Session
+
+from src.core.config.database import engine, get_config
+from src.services.user_archive_service import UserArchiveService
+from src.services.user_page_cache import user_generation
+
+
+def main() -> int:
+    config = get_config()
+    parser = argparse.ArgumentParser(description="Move long-inactive users into user_archive")
+    parser.add_argument("--days", type=int, default=config.USER_ARCHIVE_AFTER_DAYS,
+                        help="archive users inactive for more than this many days")
+    parser.add_argument("--chunk-size", type=int, default=config.USER_ARCHIVE_CHUNK_SIZE,
+                        help="number of users moved per transaction")
+    args = parser.parse_args()
+    # Invalidates the API's cached user pages when they share generations
+    user_generation.shared = config.USER_PAGE_CACHE_SHARED_GENERATIONS
+
+    print(f"🗄️  Archiving users inactive for more than {args.days} days (chunk size {args.chunk_size})...")
+    with Session(engine) as session:
+        archived = UserArchiveService(session).archive_inactive_users(
+            inactive_days=args.days,
+            chunk_size=args.chunk_size,
+        )
+    print(f"✅ Archived {archived} users")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+"""Benchmark the read paths of UserService.
+
+Seeds a database with users, then:
+
+* compares loading and serializing a page of users through the ORM (User
+  entities -> UserResponse) against the projection path (Core columns ->
+  UserRecord -> dict), reporting rows/sec and the memory retained per
+  materialized row;
+* measures the CPU time per single-user lookup (by id, email and auth0_id)
+  when the SELECT is rebuilt on every call versus the cached statements in
+  src.services.user_statements. On Postgres it also reports the planning
+  and execution time the server spends per lookup;
+* with a postgresql+psycopg:// URL, compares the wall-clock time per
+  lookup with server-side prepared statements off against
+  ``--prepare-threshold`` (what DB_PREPARE_THRESHOLD sets in the app).
+
+Usage (from the backend directory):
+    poetry run python scripts/benchmark_user_reads.py [--rows 20000] [--iterations 5] [--lookups 2000] [--prepare-threshold 5] [--database-url URL]
+
+Without --database-url a temporary SQLite database is used. Point it at a
+disposable Postgres database for numbers that match production.
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from uuid import UUID, uuid4
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert, delete, func, select
+from sqlalchemy.engine import make_url
+from sqlmodel import Session, SQLModel
+
+from src.models.entities.user import User
+from src.models.records.user_record import select_user_columns
+from src.models.responses.user_responses import UserResponse
+from src.services import user_statements
+from src.services.user_service import UserService
+
+
+def seed(engine, rows: int) -> None:
+    now = datetime.utcnow()
+    with engine.begin() as connection:
+        connection.execute(insert(User), [
+            {
+                "id": uuid4(),
+                "email": f"bench{i}@example.com",
+                "username": f"bench{i}",
+                "first_name": "Bench",
+                "last_name": f"User {i}",
+                "auth0_id": f"auth0|bench{i}",
+                "is_active": True,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for i in range(rows)
+        ])
+
+
+def orm_page(session: Session, rows: int) -> list:
+    return UserService(session).get_all_users(limit=rows)
+
+
+def orm_serialize(users: list) -> str:
+    return json.dumps([UserResponse.model_validate(user, from_attributes=True).model_dump(mode="json") for user in users])
+
+
+def projection_page(session: Session, rows: int) -> list:
+    return UserService(session).list_user_records(limit=rows)
+
+
+def projection_serialize(records: list) -> str:
+    return json.dumps([record.to_dict() for record in records])
+
+
+def measure(engine, rows: int, iterations: int, fetch, serialize) -> dict:
+    best = float("inf")
+    for _ in range(iterations):
+        with Session(engine) as session:
+            started = time.perf_counter()
+            serialize(fetch(session, rows))
+            best = min(best, time.perf_counter() - started)
+    
+    # Memory retained by the materialized results (rows + session bookkeeping)
+    with Session(engine) as session:
+        session.connection()
+        gc.collect()
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        results = fetch(session, rows)
+        retained = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+        assert len(results) == rows
+    
+    return {"rows_per_sec": rows / best, "bytes_per_row": retained / rows}
+
+
+# Single-user lookups, as the routes issue them
+
+def rebuilt_lookups(user_id, email, auth0_id) -> list:
+    """(statement, params) as built before user_statements: a new tree with inline values per call"""
+    return [
+        (select_user_columns().where(User.id == user_id).where(User.is_active).limit(1), {}),
+        (select_user_columns().where(User.email == email).where(User.is_active).limit(1), {}),
+        (select_user_columns().where(User.auth0_id == auth0_id).where(User.is_active).limit(1), {}),
+    ]
+
+
+def cached_lookups(user_id, email, auth0_id) -> list:
+    """(statement, params) from the prebuilt statements UserService uses"""
+    return [
+        (user_statements.user_record_lookup("id"), {"value": user_id}),
+        (user_statements.user_record_lookup("email"), {"value": email}),
+        (user_statements.user_record_lookup("auth0_id"), {"value": auth0_id}),
+    ]
+
+
+def sample_keys(engine, count: int) -> list:
+    with engine.connect() as connection:
+        keys = connection.execute(select(User.id, User.email, User.auth0_id)).all()
+    return [tuple(random.choice(keys)) for _ in range(count)]
+
+
+def measure_lookups(engine, keys: list, build, clock=time.process_time) -> float:
+    """Microseconds per lookup on ``clock`` (by default CPU time in this process: building, compiling, executing, fetching)"""
+    with engine.connect() as connection:
+        # Warm the compiled cache and the connection
+        for statement, params in build(*keys[0]):
+            connection.execute(statement, params).all()
+        started = clock()
+        for key in keys:
+            for statement, params in build(*key):
+                connection.execute(statement, params).all()
+        elapsed = clock() - started
+    return elapsed / (len(keys) * 3) * 1_000_000
+
+
+def prepare_connect_args(database_url: str, threshold: int) -> dict:
+    """connect() arguments setting psycopg 3's prepare_threshold (0 turns preparing off, as in the app)"""
+    if make_url(database_url).get_driver_name() != "psycopg":
+        return {}
+    return {"prepare_threshold": threshold or None}
+
+
+def prepared_lookup_times(database_url: str, keys: list, threshold: int) -> dict:
+    """Wall-clock microseconds per cached lookup without and with server-side prepared statements"""
+    times = {}
+    for label, value in (("unprepared", 0), (f"prepare_threshold={threshold}", threshold)):
+        engine = create_engine(database_url, connect_args=prepare_connect_args(database_url, value))
+        try:
+            times[label] = measure_lookups(engine, keys, cached_lookups, clock=time.perf_counter)
+        finally:
+            engine.dispose()
+    return times
+
+
+def postgres_lookup_times(engine, key) -> dict:
+    """Server-side planning and execution milliseconds per lookup shape"""
+    names = ["by_id", "by_email", "by_auth0_id"]
+    times = {}
+    with engine.connect() as connection:
+        for name, (statement, params) in zip(names, cached_lookups(*key)):
+            compiled = statement.compile(dialect=engine.dialect)
+            # exec_driver_sql skips type processing; psycopg2 can't adapt UUIDs itself
+            bound = {
+                name: str(value) if isinstance(value, UUID) else value
+                for name, value in compiled.construct_params(params).items()
+            }
+            plans = [
+                connection.exec_driver_sql(f"EXPLAIN (ANALYZE, FORMAT JSON) {compiled}", bound).scalar()[0]
+                for _ in range(20)
+            ]
+            times[name] = {
+                "planning_ms": sum(plan["Planning Time"] for plan in plans) / len(plans),
+                "execution_ms": sum(plan["Execution Time"] for plan in plans) / len(plans),
+            }
+    return times
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare ORM and projection read paths")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument(
+        "--prepare-threshold",
+        type=int,
+        default=5,
+        help="psycopg 3 prepare_threshold to compare against no preparing (0 disables, like DB_PREPARE_THRESHOLD)",
+    )
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+    
+    database_url = args.database_url
+    if database_url is None:
+        database_url = f"sqlite:///{tempfile.mkdtemp()}/benchmark.db"
+    engine = create_engine(database_url, connect_args=prepare_connect_args(database_url, args.prepare_threshold))
+    SQLModel.metadata.create_all(engine)
+    
+    with engine.connect() as connection:
+        if connection.execute(select(func.count()).select_from(User)).scalar():
+            print("❌ The user table is not empty; run the benchmark against a disposable database.")
+            return 1
+    
+    print(f"Seeding {args.rows} users...")
+    seed(engine, args.rows)
+    
+    results = {
+        "orm": measure(engine, args.rows, args.iterations, orm_page, orm_serialize),
+        "projection": measure(engine, args.rows, args.iterations, projection_page, projection_serialize),
+    }
+    
+    print(f"{'path':<12} {'rows/sec':>12} {'bytes/row':>12}")
+    for name, result in results.items():
+        print(f"{name:<12} {result['rows_per_sec']:>12,.0f} {result['bytes_per_row']:>12,.0f}")
+    speedup = results["projection"]["rows_per_sec"] / results["orm"]["rows_per_sec"]
+    saving = 1 - results["projection"]["bytes_per_row"] / results["orm"]["bytes_per_row"]
+    print(f"projection: {speedup:.2f}x rows/sec, {saving:.0%} less memory per row")
+    
+    keys = sample_keys(engine, args.lookups)
+    rebuilt = measure_lookups(engine, keys, rebuilt_lookups)
+    cached = measure_lookups(engine, keys, cached_lookups)
+    print()
+    print(f"{'lookup statements':<18} {'CPU µs/lookup':>14}")
+    print(f"{'rebuilt':<18} {rebuilt:>14,.1f}")
+    print(f"{'cached':<18} {cached:>14,.1f}")
+    print(f"cached: {1 - cached / rebuilt:.0%} less CPU per lookup")
+    if engine.dialect.name == "sqlite":
+        print("(SQLite runs in-process, so its query time is included above)")
+    
+    if engine.dialect.name == "postgresql":
+        print()
+        print(f"{'postgres':<18} {'planning ms':>12} {'execution ms':>13}")
+        for name, times in postgres_lookup_times(engine, keys[0]).items():
+            print(f"{name:<18} {times['planning_ms']:>12.3f} {times['execution_ms']:>13.3f}")
+        print("Planning time is what server-side prepared statements (DB_PREPARE_THRESHOLD) save.")
+        
+        if make_url(database_url).get_driver_name() == "psycopg" and args.prepare_threshold > 0:
+            times = prepared_lookup_times(database_url, keys, args.prepare_threshold)
+            print()
+            print(f"{'psycopg lookups':<24} {'µs/lookup':>10}")
+            for label, micros in times.items():
+                print(f"{label:<24} {micros:>10,.1f}")
+            prepared = times[f"prepare_threshold={args.prepare_threshold}"]
+            print(f"prepared: {1 - prepared / times['unprepared']:.0%} less time per lookup")
+        else:
+            print("Use a postgresql+psycopg:// URL to compare against server-side prepared statements.")
+    
+    with engine.begin() as connection:
+        connection.execute(delete(User))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
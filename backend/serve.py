@@ -0,0 +1,220 @@
+"""Pre-fork multi-worker server.
+
+Usage:
+    python serve.py
+
+The application is imported once in the supervisor, before forking, so
+workers share its memory copy-on-write. Each worker then drops the pooled
+connections it inherited and opens its own, sized so that all workers
+together stay within DB_CONNECTION_BUDGET. Workers exit gracefully after
+WORKER_MAX_REQUESTS requests (plus jitter) and are replaced.
+
+Environment:
+    HOST, PORT                  Listen address (default 0.0.0.0:8000)
+    WEB_CONCURRENCY             Number of workers (default: CPU count)
+    DB_CONNECTION_BUDGET        Connections all workers may hold together (default 20)
+    WORKER_MAX_REQUESTS         Recycle a worker after this many requests; 0 disables (default 0)
+    WORKER_MAX_REQUESTS_JITTER  Random extra requests per worker, so they don't recycle together (default 0)
+    WORKER_GRACEFUL_TIMEOUT     Seconds a stopping worker gets to finish in-flight requests (default 30);
+                                keep it above SHUTDOWN_GRACE_SECONDS
+    USER_PAGE_CACHE_SHARED_GENERATIONS  Defaults to true with more than one worker
+"""
+import logging
+import os
+import random
+import signal
+import socket
+import sys
+import time
+from typing import Dict, Optional
+
+import uvicorn
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger("serve")
+
+# A worker that dies this soon after starting is treated as a crash, and
+# its replacement is delayed so a broken deploy doesn't fork in a tight loop
+MIN_WORKER_LIFETIME_SECONDS = 1.0
+
+
+def pool_sizes(budget: int, workers: int) -> tuple:
+    """Split a global connection budget into (pool_size, max_overflow) per worker"""
+    per_worker = budget // workers
+    if per_worker < 1:
+        raise ValueError(f"DB_CONNECTION_BUDGET={budget} is too small for {workers} workers")
+    # No overflow: the budget is a hard cap on connections to the database
+    return per_worker, 0
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+class DrainingServer(uvicorn.Server):
+    """Uvicorn server that starts draining as soon as it is asked to stop"""
+
+    def handle_exit(self, sig, frame) -> None:
+        from src.core.middleware.draining import drain_state
+
+        # Readiness fails and keep-alive requests get 503 right away, while
+        # uvicorn waits for in-flight requests to finish
+        drain_state.begin_draining()
+        super().handle_exit(sig, frame)
+
+
+class Supervisor:
+    """Forks workers from a preloaded app and replaces those that exit"""
+
+    def __init__(self, app, engine, sock: socket.socket, workers: int,
+                 max_requests: int, max_requests_jitter: int, graceful_timeout: float):
+        self.app = app
+        self.engine = engine
+        self.sock = sock
+        self.workers = workers
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.graceful_timeout = graceful_timeout
+        self.children: Dict[int, float] = {}
+        self.stopping = False
+
+    def spawn(self) -> None:
+        pid = os.fork()
+        if pid:
+            self.children[pid] = time.monotonic()
+            return
+        try:
+            self.run_worker()
+            code = 0
+        except BaseException:
+            logger.exception("Worker crashed")
+            code = 1
+        finally:
+            # Skip the supervisor's atexit handlers and inherited finalizers
+            os._exit(code)
+
+    def run_worker(self) -> None:
+        from src.core.structured_logging import restart_logging_after_fork, shutdown_logging
+
+        for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+            signal.signal(sig, signal.SIG_DFL)
+        restart_logging_after_fork()
+        # Forget the pool inherited from the supervisor without closing its
+        # sockets; the worker opens its own connections on first use
+        self.engine.dispose(close=False)
+
+        config = self.worker_config()
+        logger.info("Worker started", extra={"pid": os.getpid(), "max_requests": config.limit_max_requests})
+        DrainingServer(config).run(sockets=[self.sock])
+        # Normally already done by the app's lifespan shutdown
+        shutdown_logging()
+
+    def worker_request_limit(self) -> Optional[int]:
+        """Requests a new worker serves before recycling (None: never), jittered per worker"""
+        if self.max_requests <= 0:
+            return None
+        return self.max_requests + random.randint(0, self.max_requests_jitter)
+
+    def worker_config(self) -> uvicorn.Config:
+        return uvicorn.Config(
+            self.app,
+            log_config=None,  # keep the JSON logging set up by main
+            limit_max_requests=self.worker_request_limit(),
+            timeout_graceful_shutdown=self.graceful_timeout,
+        )
+
+    def handle_stop(self, signum, frame) -> None:
+        self.stopping = True
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self.handle_stop)
+        signal.signal(signal.SIGINT, self.handle_stop)
+
+        for _ in range(self.workers):
+            self.spawn()
+
+        while not self.stopping:
+            # Poll rather than block, so a stop signal is noticed promptly
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if not pid:
+                time.sleep(0.2)
+                continue
+            started = self.children.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            logger.info("Worker exited", extra={"pid": pid, "exit_code": code})
+            if code != 0 and time.monotonic() - started < MIN_WORKER_LIFETIME_SECONDS:
+                time.sleep(MIN_WORKER_LIFETIME_SECONDS)
+            self.spawn()
+
+        self.shutdown()
+
+    def shutdown(self) -> None:
+        """Ask every worker to finish in-flight requests, then kill stragglers"""
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                self.children.pop(pid, None)
+
+        deadline = time.monotonic() + self.graceful_timeout + 5
+        while self.children and time.monotonic() < deadline:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid:
+                self.children.pop(pid, None)
+            else:
+                time.sleep(0.1)
+
+        for pid in self.children:
+            os.kill(pid, signal.SIGKILL)
+        self.sock.close()
+
+
+def main() -> None:
+    workers = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+    budget = int(os.getenv("DB_CONNECTION_BUDGET", "20"))
+    pool_size, max_overflow = pool_sizes(budget, workers)
+
+    # Must be set before the app (and so the engine) is imported
+    os.environ["DB_POOL_SIZE"] = str(pool_size)
+    os.environ["DB_MAX_OVERFLOW"] = str(max_overflow)
+    if workers > 1:
+        # Each worker caches user pages; a write in one must invalidate all
+        os.environ.setdefault("USER_PAGE_CACHE_SHARED_GENERATIONS", "true")
+
+    # Preload: workers inherit the imported app copy-on-write
+    from main import app
+    from src.core.config.database import engine
+
+    sock = bind_socket(os.getenv("HOST", "0.0.0.0"), int(os.getenv("PORT", "8000")))
+    logger.info(
+        "Starting supervisor",
+        extra={"workers": workers, "pool_size": pool_size, "max_overflow": max_overflow},
+    )
+    Supervisor(
+        app,
+        engine,
+        sock,
+        workers=workers,
+        max_requests=int(os.getenv("WORKER_MAX_REQUESTS", "0")),
+        max_requests_jitter=int(os.getenv("WORKER_MAX_REQUESTS_JITTER", "0")),
+        graceful_timeout=float(os.getenv("WORKER_GRACEFUL_TIMEOUT", "30")),
+    ).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,5 @@
+import logging
+
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlmodel import Session
 from src.core.config.database import get_session
@@ -13,6 +15,8 @@ from src.api.middleware import get_auth0_claims, require_roles
 
 router = APIRouter(prefix="/users", tags=["users"])
 
+logger = logging.getLogger(__name__)
+
 def get_user_service(db: Session = Depends(get_session)) -> UserService:
     """Dependency injection for UserService"""
     return UserService(db)
@@ -80,22 +84,18 @@ async def get_me(
     user_service: UserService = Depends(get_user_service),
 ):
     """Resolve user from Auth0 token claims, upsert, and return profile."""
-
-    print("🔍 I am in ME endpoint")
-    print(f"📋 Claims received: {claims}")
+    logger.debug("Resolving /me from token claims", extra={"claims": claims})
     
     try:
         sub = str(claims.get("sub", ""))
         email = str(claims.get("email", ""))
         name = str(claims.get("name") or claims.get("nickname") or claims.get("email") or "")
         
-        print(f"🔑 Extracted values:")
-        print(f"   sub: {sub}")
-        print(f"   email: {email}")
-        print(f"   name: {name}")
-        
         if not sub or not email or not name:
-            print("❌ Missing required claims")
+            logger.warning(
+                "Token is missing required claims",
+                extra={"has_sub": bool(sub), "has_email": bool(email), "has_name": bool(name)},
+            )
             raise HTTPException(status_code=400, detail="Invalid token: missing required claims")
 
         payload = UpsertAuth0UserRequest(
@@ -109,19 +109,15 @@ async def get_me(
             last_login=None,
         )
         
-        print(f"📦 Created payload: {payload}")
-        print("🚀 Calling upsert_user_from_auth0...")
-        
         result = user_service.upsert_user_from_auth0(payload)
-        print(f"✅ Upsert successful: {result}")
+        logger.debug("Upserted user from /me", extra={"user_id": str(result.id)})
         return result
         
-    except Exception as e:
-        print(f"❌ Error in /me endpoint: {str(e)}")
-        print(f"❌ Error type: {type(e)}")
-        import traceback
-        print(f"❌ Traceback: {traceback.format_exc()}")
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception("Error in /me endpoint")
+        raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get("/{user_id}", response_model=UserResponse)
 async def get_user(
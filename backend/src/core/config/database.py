@@ -1,13 +1,25 @@
 from sqlmodel import SQLModel, create_engine, Session
 from sqlalchemy.pool import StaticPool
 from sqlalchemy.exc import OperationalError
-from sqlalchemy import text
+from sqlalchemy import text, event
+from sqlalchemy.engine import make_url
+import logging
 import os
 import time
 from typing import Generator
 
 # Import models to ensure they're registered with SQLModel metadata
 from src.models.entities.user import User
+from src.models.entities.user_archive import UserArchive
+from src.models.entities.idempotency_key import IdempotencyKey
+from src.models.entities.cache_generation import CacheGeneration
+from src.core.middleware.deadline import DeadlineQueuePool, apply_request_deadline, release_request_deadline
+from src.core.middleware.admission import before_cursor_execute, after_cursor_execute
+from src.core.structured_logging import install_slow_query_logging
+from src.core.statement_cache import install_statement_cache_metrics
+from src.core.pool_metrics import install_pool_metrics
+
+logger = logging.getLogger(__name__)
 
 def get_database_url():
     """Get database URL based on environment"""
@@ -22,8 +34,6 @@ def get_database_url():
 # Get database URL based on environment
 DATABASE_URL = get_database_url()
 
-print(f"Initializing database connection to: {DATABASE_URL[:50]}...")
-
 def get_config():
     """Get configuration based on environment"""
     ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
@@ -37,40 +47,79 @@ def get_config():
 # Create engine with environment-appropriate settings
 config = get_config()
 
+def get_connect_args(database_url: str) -> dict:
+    """DBAPI connect() arguments for the configured driver"""
+    url = make_url(database_url)
+    if url.get_backend_name() == "sqlite":
+        return {"check_same_thread": False}
+    if url.get_driver_name() == "psycopg" and config.DB_PREPARE_THRESHOLD > 0:
+        # psycopg 3 prepares a statement server-side once it has run this
+        # many times on a connection, so Postgres stops re-planning it.
+        # psycopg2 has no server-side prepared statements.
+        return {"prepare_threshold": config.DB_PREPARE_THRESHOLD}
+    return {}
+
 engine = create_engine(
     DATABASE_URL,
-    echo=config.DEBUG,  # Only echo in debug mode
+    echo=False,  # SQL is logged through install_slow_query_logging instead
     pool_pre_ping=True,  # Verify connections before use
     pool_recycle=300,  # Recycle connections every 5 minutes
-    pool_timeout=30,  # Wait up to 30 seconds for a connection
-    max_overflow=10,  # Allow up to 10 connections beyond pool size
-    connect_args={
-        "check_same_thread": False
-    } if "sqlite" in DATABASE_URL else {}
+    poolclass=DeadlineQueuePool,  # Checkout waits are capped at the request's remaining deadline
+    pool_timeout=config.DB_POOL_TIMEOUT_SECONDS,  # Max wait for a pooled connection
+    pool_size=config.DB_POOL_SIZE,  # Persistent connections per process
+    max_overflow=config.DB_MAX_OVERFLOW,  # Extra connections allowed under burst
+    query_cache_size=config.DB_QUERY_CACHE_SIZE,  # Compiled statements kept per engine
+    connect_args=get_connect_args(DATABASE_URL)
 )
 
+# Bind request deadlines (statement_timeout, cancellation) to the
+# connections sessions check out, and detach them when they are returned
+event.listen(Session, "after_begin", apply_request_deadline)
+event.listen(engine, "checkin", release_request_deadline)
+
+# Feed statement latency into the admission controller
+event.listen(engine, "before_cursor_execute", before_cursor_execute)
+event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+# Only statements above the threshold are logged
+install_slow_query_logging(engine, config.SLOW_QUERY_MS)
+
+# Compiled statement cache hit rate, under statement_cache in /admin/metrics
+install_statement_cache_metrics(engine)
+
+# Connection hold times, under db_pool in /admin/metrics
+install_pool_metrics(engine)
+
 def create_db_and_tables():
     """Create database tables if they don't exist"""
     max_retries = 5
     retry_delay = 2
     
+    logger.info(
+        "Initializing database connection",
+        extra={"database": make_url(DATABASE_URL).render_as_string(hide_password=True)},
+    )
+    
     for attempt in range(max_retries):
         try:
-            print(f"Testing database connection (attempt {attempt + 1}/{max_retries})")
+            logger.info("Testing database connection", extra={"attempt": attempt + 1, "max_retries": max_retries})
             # Test the connection
             with engine.connect() as connection:
                 connection.execute(text("SELECT 1"))
-            print("Database connection successful")
+            logger.info("Database connection successful")
             
             # Create all tables
-            print("Creating database tables...")
+            logger.info("Creating database tables")
             SQLModel.metadata.create_all(engine)
-            print("Database tables created successfully")
+            logger.info("Database tables created successfully")
             return
         except OperationalError as e:
-            print(f"Database connection failed (attempt {attempt + 1}/{max_retries}): {str(e)}")
+            logger.warning(
+                "Database connection failed",
+                extra={"attempt": attempt + 1, "max_retries": max_retries, "error": str(e)},
+            )
             if attempt < max_retries - 1:
-                print(f"Retrying in {retry_delay} seconds...")
+                logger.info("Retrying database connection", extra={"retry_delay_seconds": retry_delay})
                 time.sleep(retry_delay)
                 retry_delay *= 2  # Exponential backoff
             else:
@@ -79,6 +128,12 @@ def create_db_and_tables():
                 return
 
 def get_session() -> Generator[Session, None, None]:
-    """Dependency to get database session"""
+    """Dependency to get database session.
+    
+    Creating the session does not touch the pool: a connection is checked
+    out on its first query, so requests rejected before querying never
+    take one. Closing the session at the end of the request returns the
+    connection unless it was released earlier (see UserService).
+    """
     with Session(engine) as session:
-        yield session 
\ No newline at end of file
+        yield session
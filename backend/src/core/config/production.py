@@ -1,6 +1,10 @@
 import os
+import json
+import logging
 from typing import Optional
 
+logger = logging.getLogger(__name__)
+
 class ProductionConfig:
     """Production configuration for Render deployment"""
     
@@ -20,12 +24,12 @@ class ProductionConfig:
             if not cls._DATABASE_URL:
                 raise ValueError("DATABASE_URL environment variable must be set in production")
             
-            print(f"Using DATABASE_URL from environment: {cls._DATABASE_URL[:50]}...")
+            logger.debug("Using DATABASE_URL from environment")
             
             # Handle Render's DATABASE_URL format (add sslmode if needed)
             if cls._DATABASE_URL.startswith("postgres://"):
                 cls._DATABASE_URL = cls._DATABASE_URL.replace("postgres://", "postgresql://", 1)
-                print("Converted postgres:// to postgresql://")
+                logger.debug("Converted postgres:// to postgresql://")
             
             # Add SSL mode for production databases (especially Render)
             if ("render.com" in cls._DATABASE_URL or "localhost" not in cls._DATABASE_URL) and "sslmode" not in cls._DATABASE_URL:
@@ -33,7 +37,7 @@ class ProductionConfig:
                     cls._DATABASE_URL += "&sslmode=require"
                 else:
                     cls._DATABASE_URL += "?sslmode=require"
-                print("Added SSL mode to database URL")
+                logger.debug("Added SSL mode to database URL")
         
         return cls._DATABASE_URL
     
@@ -88,11 +92,85 @@ class ProductionConfig:
         
         return cls._SECRET_KEY
     
+    # Archival of soft-deleted users
+    USER_ARCHIVE_AFTER_DAYS: int = int(os.getenv("USER_ARCHIVE_AFTER_DAYS", "90"))
+    USER_ARCHIVE_CHUNK_SIZE: int = int(os.getenv("USER_ARCHIVE_CHUNK_SIZE", "500"))
+    
+    # User change feed (GET /users/changes)
+    USER_CHANGES_MAX_WAIT_SECONDS: float = float(os.getenv("USER_CHANGES_MAX_WAIT_SECONDS", "30"))
+    USER_CHANGES_POLL_INTERVAL_SECONDS: float = float(os.getenv("USER_CHANGES_POLL_INTERVAL_SECONDS", "1"))
+    # Must exceed the longest user write transaction plus clock skew between
+    # app hosts; see UserService.get_user_changes
+    USER_CHANGES_SETTLE_SECONDS: float = float(os.getenv("USER_CHANGES_SETTLE_SECONDS", "1"))
+    
+    # Request deadlines: total budget per request (including pool checkout
+    # wait), optionally overridden per path prefix with a JSON object
+    REQUEST_DEADLINE_SECONDS: float = float(os.getenv("REQUEST_DEADLINE_SECONDS", "15"))
+    ROUTE_DEADLINES: dict = {
+        "/health": 2.0,
+        "/ready": 2.0,
+        "/users/changes": USER_CHANGES_MAX_WAIT_SECONDS + 5,
+        **json.loads(os.getenv("ROUTE_DEADLINES", "{}")),
+    }
+    DB_POOL_TIMEOUT_SECONDS: float = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "10"))
+    # Time shutdown waits for in-flight requests before closing the pool
+    SHUTDOWN_GRACE_SECONDS: float = float(os.getenv("SHUTDOWN_GRACE_SECONDS", "20"))
+    # Connections per process; serve.py derives these from DB_CONNECTION_BUDGET
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    # Compiled SQL statements cached per engine, and executions of a statement
+    # on one connection before it is prepared server-side (psycopg 3 only; 0 disables)
+    DB_QUERY_CACHE_SIZE: int = int(os.getenv("DB_QUERY_CACHE_SIZE", "500"))
+    DB_PREPARE_THRESHOLD: int = int(os.getenv("DB_PREPARE_THRESHOLD", "5"))
+    
+    # Admission control: per-route-class concurrency limits that shrink when
+    # average DB statement latency exceeds the target
+    ADMISSION_CONTROL_ENABLED: bool = os.getenv("ADMISSION_CONTROL_ENABLED", "true").lower() == "true"
+    ADMISSION_TARGET_DB_LATENCY_MS: float = float(os.getenv("ADMISSION_TARGET_DB_LATENCY_MS", "100"))
+    ADMISSION_CLASS_LIMITS: dict = json.loads(os.getenv("ADMISSION_CLASS_LIMITS", "{}"))
+    
+    # Idempotency-Key handling for user-creating endpoints
+    IDEMPOTENCY_TTL_HOURS: float = float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+    IDEMPOTENCY_WAIT_SECONDS: float = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))
+    IDEMPOTENCY_LOCK_SECONDS: float = float(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+    
+    # Write-behind for non-critical user updates (e.g. last_login)
+    USER_WRITE_BEHIND_ENABLED: bool = os.getenv("USER_WRITE_BEHIND_ENABLED", "true").lower() == "true"
+    USER_WRITE_BEHIND_FLUSH_SIZE: int = int(os.getenv("USER_WRITE_BEHIND_FLUSH_SIZE", "500"))
+    USER_WRITE_BEHIND_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("USER_WRITE_BEHIND_FLUSH_INTERVAL_SECONDS", "1"))
+    USER_WRITE_BEHIND_MAX_PENDING: int = int(os.getenv("USER_WRITE_BEHIND_MAX_PENDING", "10000"))
+    
+    # Cache of serialized GET /users/ pages, dropped on every user write.
+    # Share the write counter through the database when more than one
+    # process writes users (serve.py turns this on for multiple workers).
+    USER_PAGE_CACHE_ENABLED: bool = os.getenv("USER_PAGE_CACHE_ENABLED", "true").lower() == "true"
+    USER_PAGE_CACHE_MAX_BYTES: int = int(os.getenv("USER_PAGE_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+    USER_PAGE_CACHE_SHARED_GENERATIONS: bool = os.getenv("USER_PAGE_CACHE_SHARED_GENERATIONS", "false").lower() == "true"
+    
     # Logging
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    # Fraction of requests per path whose INFO/DEBUG records are kept
+    LOG_SAMPLE_RATES: dict = {
+        "/health": 0.01,
+        "/ready": 0.01,
+        "/users/me": 0.1,
+        **json.loads(os.getenv("LOG_SAMPLE_RATES", "{}")),
+    }
+    SLOW_QUERY_MS: float = float(os.getenv("SLOW_QUERY_MS", "200"))
     
 
     
+    # Admin endpoints (/admin/...) require this token in X-Admin-Token;
+    # they are disabled when it is unset
+    ADMIN_TOKEN: Optional[str] = os.getenv("ADMIN_TOKEN")
+    
+    # On-demand request profiling (no middleware or hooks are installed when disabled)
+    PROFILING_ENABLED: bool = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+    PROFILING_SAMPLE_RATE: float = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+    PROFILING_INTERVAL_MS: float = float(os.getenv("PROFILING_INTERVAL_MS", "5"))
+    PROFILING_MAX_PROFILES: int = int(os.getenv("PROFILING_MAX_PROFILES", "50"))
+    
     @classmethod
     def is_production(cls) -> bool:
         """Check if running in production"""
@@ -102,5 +180,5 @@ class ProductionConfig:
     def get_cors_origins(cls) -> list:
         """Get allowed CORS origins"""
         origins = cls.ALLOWED_ORIGINS
-        print(f"CORS Origins configured: {origins}")
+        logger.debug("CORS origins configured", extra={"origins": origins})
         return origins 
\ No newline at end of file
@@ -0,0 +1,12 @@
+class IdempotencyKeyReusedException(Exception):
+    """Raised when an Idempotency-Key is reused with a different request body"""
+    
+    def __init__(self, key: str):
+        super().__init__(f"Idempotency-Key {key} was already used with a different request")
+
+
+class IdempotencyKeyInProgressException(Exception):
+    """Raised when the original request for an Idempotency-Key is still running"""
+    
+    def __init__(self, key: str):
+        super().__init__(f"A request with Idempotency-Key {key} is still in progress")
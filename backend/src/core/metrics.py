@@ -0,0 +1,22 @@
+import threading
+from typing import Callable, Dict
+
+
+class MetricsRegistry:
+    """Named collectors whose snapshots are served by GET /admin/metrics"""
+    
+    def __init__(self):
+        self._collectors: Dict[str, Callable[[], dict]] = {}
+        self._lock = threading.Lock()
+    
+    def register(self, name: str, collector: Callable[[], dict]) -> None:
+        with self._lock:
+            self._collectors[name] = collector
+    
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            collectors = dict(self._collectors)
+        return {name: collector() for name, collector in sorted(collectors.items())}
+
+
+metrics = MetricsRegistry()
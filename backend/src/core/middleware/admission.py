@@ -0,0 +1,185 @@
+import threading
+import time
+from typing import Dict, Optional
+
+from src.core.middleware.responses import send_json_error
+
+# Route classes in priority order. Health checks, the caller's own profile
+# and writes keep admitting requests long after bulk listing is shed. The
+# change feed has a class of its own: a long-poll keeps its slot for the
+# whole wait while holding a connection only for each short poll, so it
+# must not use up the slots of bulk listings.
+DEFAULT_CLASS_LIMITS: Dict[str, Dict[str, float]] = {
+    "critical": {"initial": 64, "minimum": 16, "maximum": 256, "backoff": 0.9},
+    "write": {"initial": 32, "minimum": 8, "maximum": 128, "backoff": 0.8},
+    "read": {"initial": 32, "minimum": 4, "maximum": 128, "backoff": 0.7},
+    "bulk": {"initial": 8, "minimum": 1, "maximum": 32, "backoff": 0.5},
+    "feed": {"initial": 64, "minimum": 8, "maximum": 256, "backoff": 0.5},
+}
+
+CRITICAL_PATHS = ("/health", "/ready", "/users/me")
+BULK_PATHS = ("/users/", "/users/all")
+FEED_PATHS = ("/users/changes",)
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+
+
+def classify_request(method: str, path: str) -> str:
+    """Map a request to its admission class"""
+    if path in CRITICAL_PATHS:
+        return "critical"
+    if method in WRITE_METHODS:
+        return "write"
+    if path in BULK_PATHS:
+        return "bulk"
+    if path in FEED_PATHS:
+        return "feed"
+    return "read"
+
+
+class DatabaseLatencyTracker:
+    """Exponentially weighted moving average of statement execution time.
+    
+    Fed from engine cursor events, so it reflects how the database is doing
+    right now regardless of which route issued the statement.
+    """
+    
+    def __init__(self, alpha: float = 0.2):
+        self.alpha = alpha
+        self.average_seconds = 0.0
+        self._lock = threading.Lock()
+    
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            if self.average_seconds == 0.0:
+                self.average_seconds = seconds
+            else:
+                self.average_seconds += self.alpha * (seconds - self.average_seconds)
+    
+    def reset(self) -> None:
+        with self._lock:
+            self.average_seconds = 0.0
+
+
+db_latency = DatabaseLatencyTracker()
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """Engine hook recording when a statement started.
+    
+    The start is kept on the execution context, which is discarded with the
+    statement, so statements that fail leave nothing behind on the connection.
+    """
+    if context is not None:
+        context.admission_query_start = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """Engine hook feeding statement latency into the admission controller"""
+    start = getattr(context, "admission_query_start", None)
+    if start is not None:
+        db_latency.observe(time.perf_counter() - start)
+
+
+class AIMDLimiter:
+    """Concurrency limit with additive increase / multiplicative decrease.
+    
+    Every completed request while the database is healthy grows the limit by
+    roughly one per round of requests; while it is slow the limit is cut by
+    ``backoff``, at most once per ``cooldown`` seconds.
+    """
+    
+    def __init__(
+        self,
+        initial: float,
+        minimum: float,
+        maximum: float,
+        backoff: float = 0.75,
+        cooldown: float = 1.0,
+    ):
+        self.limit = float(initial)
+        self.minimum = float(minimum)
+        self.maximum = float(maximum)
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.rejected = 0
+        self._last_decrease = 0.0
+    
+    def try_acquire(self) -> bool:
+        if self.in_flight >= int(self.limit):
+            self.rejected += 1
+            return False
+        self.in_flight += 1
+        return True
+    
+    def release(self, overloaded: bool) -> None:
+        self.in_flight -= 1
+        if overloaded:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.cooldown:
+                self.limit = max(self.minimum, self.limit * self.backoff)
+                self._last_decrease = now
+        else:
+            self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+    
+    def snapshot(self) -> Dict[str, float]:
+        return {"limit": int(self.limit), "in_flight": self.in_flight, "rejected": self.rejected}
+
+
+class AdmissionController:
+    """Per-class limiters driven by the shared database latency signal"""
+    
+    def __init__(
+        self,
+        target_latency_seconds: float,
+        class_limits: Optional[Dict[str, Dict[str, float]]] = None,
+        latency_tracker: DatabaseLatencyTracker = db_latency,
+    ):
+        self.target_latency_seconds = target_latency_seconds
+        self.latency_tracker = latency_tracker
+        self.limiters = {
+            name: AIMDLimiter(**{**settings, **(class_limits or {}).get(name, {})})
+            for name, settings in DEFAULT_CLASS_LIMITS.items()
+        }
+    
+    def limiter_for(self, method: str, path: str) -> AIMDLimiter:
+        return self.limiters[classify_request(method, path)]
+    
+    def overloaded(self) -> bool:
+        return self.latency_tracker.average_seconds > self.target_latency_seconds
+    
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        return {name: limiter.snapshot() for name, limiter in self.limiters.items()}
+
+
+class AdmissionControlMiddleware:
+    """ASGI middleware shedding load before it reaches the threadpool and DB pool.
+    
+    Requests beyond their class limit fail fast with 503 and Retry-After
+    instead of queueing until the pool timeout.
+    """
+    
+    def __init__(self, app, controller: AdmissionController, retry_after_seconds: int = 1):
+        self.app = app
+        self.controller = controller
+        self.retry_after_seconds = retry_after_seconds
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        limiter = self.controller.limiter_for(scope["method"], scope["path"])
+        if not limiter.try_acquire():
+            await send_json_error(
+                send,
+                503,
+                "Server is overloaded, please retry",
+                headers={"Retry-After": str(self.retry_after_seconds)},
+            )
+            return
+        
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(self.controller.overloaded())
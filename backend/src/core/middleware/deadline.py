@@ -0,0 +1,250 @@
+import logging
+import math
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+import anyio
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+from src.core.middleware.responses import send_json_error
+
+logger = logging.getLogger(__name__)
+
+# Key under which a checked-out DBAPI connection remembers its request deadline
+_CONNECTION_INFO_KEY = "request_deadline"
+
+_current_deadline: ContextVar[Optional["RequestDeadline"]] = ContextVar("request_deadline", default=None)
+
+
+class RequestDeadlineExceeded(Exception):
+    """Raised when a request runs out of its time budget or its client went away"""
+
+
+class RequestDeadline:
+    """Time budget of a single request and the DB connections working for it.
+    
+    The budget covers the whole request, including the wait for a pooled
+    connection. Connections are registered when a session transaction begins
+    so an in-flight query can be cancelled on timeout or client disconnect.
+    """
+    
+    def __init__(self, budget_seconds: float):
+        self.budget_seconds = budget_seconds
+        self.expires_at = time.monotonic() + budget_seconds
+        self.cancel_reason: Optional[str] = None
+        self._connections = set()
+        self._lock = threading.Lock()
+    
+    def remaining(self) -> float:
+        """Seconds left in the budget (never negative)"""
+        return max(0.0, self.expires_at - time.monotonic())
+    
+    @property
+    def expired(self) -> bool:
+        return self.cancel_reason is not None or self.remaining() <= 0
+    
+    def attach(self, connection) -> None:
+        """Apply the remaining budget to a connection that just began a transaction"""
+        if self.expired:
+            raise RequestDeadlineExceeded(self.cancel_reason or "Request deadline exceeded")
+        
+        if connection.dialect.name == "postgresql":
+            # SET LOCAL only lasts for the current transaction, so pooled
+            # connections go back to the server default on release
+            timeout_ms = max(1, int(self.remaining() * 1000))
+            connection.exec_driver_sql(f"SET LOCAL statement_timeout = {timeout_ms}")
+        
+        fairy = connection.connection
+        with self._lock:
+            self._connections.add(fairy.dbapi_connection)
+        fairy.info[_CONNECTION_INFO_KEY] = self
+    
+    def release(self, dbapi_connection) -> None:
+        """Forget a connection once it is returned to the pool"""
+        with self._lock:
+            self._connections.discard(dbapi_connection)
+    
+    def cancel(self, reason: str) -> None:
+        """Mark the request as cancelled and abort any query running for it"""
+        with self._lock:
+            if self.cancel_reason is None:
+                self.cancel_reason = reason
+            connections = list(self._connections)
+            for dbapi_connection in connections:
+                _cancel_query(dbapi_connection, self.cancel_reason)
+
+
+def _cancel_query(dbapi_connection, reason: str) -> None:
+    """Best-effort cancellation of the statement running on a DBAPI connection.
+    
+    A failure is logged rather than raised: the client already got its 504
+    or went away, but the query may still be running on the server. The
+    request ID is stamped by the logging filter; parameters are never logged.
+    """
+    driver = type(dbapi_connection).__module__.split(".")[0]
+    try:
+        if hasattr(dbapi_connection, "cancel"):
+            # psycopg2: sends a cancel request to the backend
+            dbapi_connection.cancel()
+        elif hasattr(dbapi_connection, "interrupt"):
+            # sqlite3
+            dbapi_connection.interrupt()
+        else:
+            logger.warning("Query not cancelled: driver cannot cancel", extra={"reason": reason, "driver": driver})
+    except Exception as exc:
+        logger.warning(
+            "Query cancellation failed; it may still be running",
+            extra={"reason": reason, "driver": driver, "error": f"{type(exc).__name__}: {exc}"},
+        )
+
+
+def get_request_deadline() -> Optional[RequestDeadline]:
+    """Deadline of the request being handled in the current context, if any"""
+    return _current_deadline.get()
+
+
+def apply_request_deadline(session, transaction, connection) -> None:
+    """Session ``after_begin`` hook binding the current request deadline to its connection"""
+    deadline = _current_deadline.get()
+    if deadline is not None:
+        deadline.attach(connection)
+
+
+def release_request_deadline(dbapi_connection, connection_record) -> None:
+    """Pool ``checkin`` hook detaching a returned connection from its request"""
+    deadline = connection_record.info.pop(_CONNECTION_INFO_KEY, None)
+    if deadline is not None:
+        deadline.release(dbapi_connection)
+
+
+class DeadlineQueuePool(QueuePool):
+    """QueuePool whose checkout wait never outlasts the current request's deadline.
+    
+    ``timeout`` stays the upper bound; inside a request the wait is capped
+    at the remaining budget, and running out of it while waiting raises
+    RequestDeadlineExceeded instead of a pool timeout.
+    """
+    
+    @property
+    def _timeout(self) -> float:
+        deadline = _current_deadline.get()
+        if deadline is None:
+            return self._configured_timeout
+        return min(self._configured_timeout, deadline.remaining())
+    
+    @_timeout.setter
+    def _timeout(self, value: float) -> None:
+        self._configured_timeout = value
+    
+    def _do_get(self):
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            deadline = _current_deadline.get()
+            if deadline is not None and deadline.expired:
+                raise RequestDeadlineExceeded(deadline.cancel_reason or "Request deadline exceeded") from None
+            raise
+    
+    def recreate(self) -> "DeadlineQueuePool":
+        pool = super().recreate()
+        # Not the capped value of whichever request happens to recreate it
+        pool._timeout = self._configured_timeout
+        return pool
+
+
+class DeadlineMiddleware:
+    """ASGI middleware enforcing a per-route time budget on every HTTP request.
+    
+    When the budget runs out the in-flight query is cancelled and the client
+    gets a 504. When the client disconnects first, the query is cancelled and
+    the handler is abandoned.
+    """
+    
+    def __init__(self, app, default_seconds: float, route_seconds: Optional[Dict[str, float]] = None):
+        self.app = app
+        self.default_seconds = default_seconds
+        # Longest prefix wins
+        self.route_seconds = sorted((route_seconds or {}).items(), key=lambda item: len(item[0]), reverse=True)
+    
+    def budget_for(self, path: str) -> float:
+        for prefix, seconds in self.route_seconds:
+            if path.startswith(prefix):
+                return seconds
+        return self.default_seconds
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        deadline = RequestDeadline(self.budget_for(scope["path"]))
+        token = _current_deadline.set(deadline)
+        
+        response_started = False
+        response_complete = False
+        timed_out = False
+        disconnected = False
+        send_stream, receive_stream = anyio.create_memory_object_stream(math.inf)
+        
+        async def wrapped_receive():
+            if disconnected and receive_stream.statistics().current_buffer_used == 0:
+                return {"type": "http.disconnect"}
+            return await receive_stream.receive()
+        
+        async def wrapped_send(message):
+            nonlocal response_started, response_complete
+            if timed_out or disconnected:
+                # A 504 has already been sent on the handler's behalf, or
+                # nobody is left to read the response
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_complete = True
+            await send(message)
+        
+        async def pump_receive(app_scope):
+            # Owns the real receive channel so a disconnect is noticed even
+            # while the handler is blocked in a worker thread
+            nonlocal disconnected
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    disconnected = True
+                    await send_stream.send(message)
+                    if not response_complete:
+                        deadline.cancel("Client disconnected")
+                        app_scope.cancel()
+                    return
+                await send_stream.send(message)
+        
+        async def enforce_deadline(app_scope):
+            nonlocal timed_out
+            await anyio.sleep(deadline.remaining())
+            deadline.cancel("Request deadline exceeded")
+            if not response_started:
+                timed_out = True
+                await send_json_error(send, 504, "Request deadline exceeded")
+            app_scope.cancel()
+        
+        app_error = None
+        try:
+            async with anyio.create_task_group() as task_group:
+                with anyio.CancelScope() as app_scope:
+                    task_group.start_soon(pump_receive, app_scope)
+                    task_group.start_soon(enforce_deadline, app_scope)
+                    try:
+                        await self.app(scope, wrapped_receive, wrapped_send)
+                    except Exception as exc:
+                        # Re-raised below so it doesn't surface as an ExceptionGroup
+                        app_error = exc
+                task_group.cancel_scope.cancel()
+        finally:
+            _current_deadline.reset(token)
+        
+        if app_error is not None and not timed_out:
+            raise app_error
+
@@ -0,0 +1,94 @@
+import threading
+import time
+
+import anyio
+
+from src.core.middleware.responses import send_json_error
+
+
+class DrainState:
+    """Tracks in-flight requests and whether the process is shutting down"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.draining = False
+        self.draining_since = None
+        self.in_flight = 0
+        self.rejected = 0
+
+    def reset(self) -> None:
+        with self._lock:
+            self.draining = False
+            self.draining_since = None
+            self.rejected = 0
+
+    def begin_draining(self) -> None:
+        """Fail readiness and reject new requests from now on (idempotent)"""
+        with self._lock:
+            if not self.draining:
+                self.draining = True
+                self.draining_since = time.monotonic()
+
+    def try_enter(self) -> bool:
+        with self._lock:
+            if self.draining:
+                self.rejected += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def exit(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    async def wait_idle(self, timeout: float, poll_interval: float = 0.05) -> bool:
+        """Wait until no request is in flight; returns False if ``timeout`` ran out first"""
+        with anyio.move_on_after(timeout):
+            while self.in_flight > 0:
+                await anyio.sleep(poll_interval)
+            return True
+        return False
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "draining": self.draining,
+                "in_flight": self.in_flight,
+                "rejected": self.rejected,
+            }
+
+
+drain_state = DrainState()
+
+
+class DrainingMiddleware:
+    """Reject new requests with 503 once the process has started draining.
+
+    Requests already in flight are counted so shutdown can wait for them.
+    Rejections ask the client to close the connection, so load balancers and
+    keep-alive clients reconnect to another instance.
+    """
+
+    def __init__(self, app, state: DrainState = drain_state, retry_after_seconds: int = 1):
+        self.app = app
+        self.state = state
+        self.retry_after_seconds = retry_after_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if not self.state.try_enter():
+            await send_json_error(
+                send,
+                503,
+                "Server is shutting down, please retry",
+                headers={"Retry-After": str(self.retry_after_seconds), "Connection": "close"},
+            )
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.state.exit()
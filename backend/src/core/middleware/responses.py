@@ -0,0 +1,12 @@
+import json
+from typing import Dict, Optional
+
+
+async def send_json_error(send, status_code: int, detail: str, headers: Optional[Dict[str, str]] = None) -> None:
+    """Send a complete JSON error response (same shape as HTTPException) from ASGI middleware"""
+    body = json.dumps({"detail": detail}).encode()
+    raw_headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    for name, value in (headers or {}).items():
+        raw_headers.append((name.lower().encode(), value.encode()))
+    await send({"type": "http.response.start", "status": status_code, "headers": raw_headers})
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,76 @@
+import threading
+import time
+from collections import deque
+from typing import Dict
+
+from sqlalchemy import event
+
+from src.core.metrics import metrics
+
+
+class PoolOccupancyStats:
+    """How long pooled connections stay checked out, from pool checkout/checkin events.
+
+    Hold times are kept for the last ``window`` checkins. ``busy_connections``
+    is the average number of connections checked out since the previous
+    snapshot (total hold time over elapsed time), which is what the pool
+    has to be sized for.
+    """
+
+    def __init__(self, engine, window: int = 1000):
+        self.engine = engine
+        self._lock = threading.Lock()
+        self._hold_seconds = deque(maxlen=window)
+        self.checkouts = 0
+        self.total_hold_seconds = 0.0
+        self._interval_hold_seconds = 0.0
+        self._interval_started = time.monotonic()
+
+    def checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        connection_record.info["pool_checked_out_at"] = time.monotonic()
+
+    def checkin(self, dbapi_connection, connection_record) -> None:
+        checked_out_at = connection_record.info.pop("pool_checked_out_at", None)
+        if checked_out_at is None:
+            return
+        held = time.monotonic() - checked_out_at
+        with self._lock:
+            self.checkouts += 1
+            self.total_hold_seconds += held
+            self._interval_hold_seconds += held
+            self._hold_seconds.append(held)
+
+    def snapshot(self) -> Dict[str, float]:
+        now = time.monotonic()
+        with self._lock:
+            held = sorted(self._hold_seconds)
+            elapsed = now - self._interval_started
+            busy = self._interval_hold_seconds / elapsed if elapsed > 0 else 0.0
+            self._interval_hold_seconds = 0.0
+            self._interval_started = now
+            checkouts = self.checkouts
+
+        def percentile_ms(fraction: float) -> float:
+            if not held:
+                return 0.0
+            return round(held[min(len(held) - 1, int(fraction * len(held)))] * 1000, 3)
+
+        return {
+            "checkouts": checkouts,
+            "checked_out": self.engine.pool.checkedout(),
+            "busy_connections": round(busy, 3),
+            "hold_ms_mean": round(sum(held) / len(held) * 1000, 3) if held else 0.0,
+            "hold_ms_p50": percentile_ms(0.50),
+            "hold_ms_p95": percentile_ms(0.95),
+            "hold_ms_p99": percentile_ms(0.99),
+            "hold_ms_max": round(held[-1] * 1000, 3) if held else 0.0,
+        }
+
+
+def install_pool_metrics(engine) -> PoolOccupancyStats:
+    """Track connection hold times for ``engine`` under the db_pool metric"""
+    stats = PoolOccupancyStats(engine)
+    event.listen(engine, "checkout", stats.checkout)
+    event.listen(engine, "checkin", stats.checkin)
+    metrics.register("db_pool", stats.snapshot)
+    return stats
@@ -0,0 +1,291 @@
+import asyncio
+import functools
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from starlette.routing import request_response
+
+from src.core.security import token_matches
+
+_current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+
+# Leaf frames in these files mean the thread is idle (waiting for work or I/O
+# readiness), not working on the request
+_IDLE_FILES = ("threading.py", "queue.py", "selectors.py")
+
+MAX_STATEMENTS_PER_PROFILE = 1000
+
+
+class RequestProfile:
+    """Wall-clock stack samples and SQL timeline of one request"""
+    
+    def __init__(self, method: str, path: str, trigger: str):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.trigger = trigger
+        self.started_at = time.time()
+        self.status_code: Optional[int] = None
+        self.duration_ms: Optional[float] = None
+        self.process_cpu_ms: Optional[float] = None
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.statements: List[Dict] = []
+        # Worker threads currently running this request's code (entries may nest)
+        self._working_threads: Counter = Counter()
+        self._threads_lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._loop_thread_id: Optional[int] = None
+        self._started = time.perf_counter()
+        self._cpu_started = time.process_time()
+    
+    def bind_task(self) -> None:
+        """Attribute the calling event-loop thread to this request while its task is the one running"""
+        self._task = asyncio.current_task()
+        self._loop_thread_id = threading.get_ident()
+    
+    def enter_thread(self) -> None:
+        with self._threads_lock:
+            self._working_threads[threading.get_ident()] += 1
+    
+    def exit_thread(self) -> None:
+        thread_id = threading.get_ident()
+        with self._threads_lock:
+            self._working_threads[thread_id] -= 1
+            if self._working_threads[thread_id] <= 0:
+                del self._working_threads[thread_id]
+    
+    def working_threads(self) -> List[int]:
+        """Threads running this request's work right now.
+        
+        The event loop and the threadpool are shared, so a thread only
+        counts between entry and exit of this request's work; anything else
+        it runs belongs to other requests.
+        """
+        with self._threads_lock:
+            thread_ids = list(self._working_threads)
+        task = self._task
+        if task is not None and not task.done() and asyncio.current_task(task.get_loop()) is task:
+            thread_ids.append(self._loop_thread_id)
+        return thread_ids
+    
+    def offset_ms(self) -> float:
+        return round((time.perf_counter() - self._started) * 1000, 3)
+    
+    def finish(self, status_code: Optional[int]) -> None:
+        self.status_code = status_code
+        self.duration_ms = self.offset_ms()
+        # Process-wide, so it includes any requests running concurrently
+        self.process_cpu_ms = round((time.process_time() - self._cpu_started) * 1000, 3)
+    
+    def folded(self) -> str:
+        """Stacks in folded format (``frame;frame;frame count``), as read by flamegraph.pl and speedscope"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+    
+    def summary(self) -> Dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "trigger": self.trigger,
+            "started_at": self.started_at,
+            "status_code": self.status_code,
+            "duration_ms": self.duration_ms,
+            "process_cpu_ms": self.process_cpu_ms,
+            "samples": self.samples,
+            "statements": len(self.statements),
+        }
+    
+    def to_dict(self) -> Dict:
+        return {**self.summary(), "sql_timeline": self.statements}
+
+
+class ProfileStore:
+    """Keeps the most recent profiles, evicting the oldest beyond ``max_profiles``"""
+    
+    def __init__(self, max_profiles: int):
+        self.max_profiles = max_profiles
+        self._profiles: "OrderedDict[str, RequestProfile]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def add(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._profiles[profile.id] = profile
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+    
+    def get(self, profile_id: str) -> Optional[RequestProfile]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+    
+    def list(self) -> List[RequestProfile]:
+        with self._lock:
+            return list(reversed(self._profiles.values()))
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Background thread sampling the stacks of threads working on profiled requests.
+    
+    It only runs while at least one profile is active.
+    """
+    
+    def __init__(self, interval_seconds: float):
+        self.interval_seconds = interval_seconds
+        self._active: Dict[str, RequestProfile] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start_profile(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._active[profile.id] = profile
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+    
+    def stop_profile(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._active.pop(profile.id, None)
+    
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                profiles = list(self._active.values())
+                if not profiles:
+                    self._thread = None
+                    return
+            frames = sys._current_frames()
+            for profile in profiles:
+                for thread_id in profile.working_threads():
+                    frame = frames.get(thread_id)
+                    if frame is None or frame.f_code.co_filename.endswith(_IDLE_FILES):
+                        continue
+                    stack = []
+                    while frame is not None:
+                        stack.append(_frame_label(frame))
+                        frame = frame.f_back
+                    profile.stacks[";".join(reversed(stack))] += 1
+                    profile.samples += 1
+            time.sleep(self.interval_seconds)
+
+
+def _track_statement_start(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    if profile is not None and context is not None:
+        # On the execution context, so failed statements don't leave it behind
+        context.profile_query_start = profile.offset_ms()
+
+
+def _track_statement_end(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    start_ms = getattr(context, "profile_query_start", None)
+    if profile is not None and start_ms is not None:
+        if len(profile.statements) < MAX_STATEMENTS_PER_PROFILE:
+            profile.statements.append({
+                "start_ms": start_ms,
+                "duration_ms": round(profile.offset_ms() - start_ms, 3),
+                "statement": statement,
+            })
+
+
+def install_profiling_hooks(engine) -> None:
+    """Record the SQL timeline of profiled requests (only installed when profiling is enabled)"""
+    event.listen(engine, "before_cursor_execute", _track_statement_start)
+    event.listen(engine, "after_cursor_execute", _track_statement_end)
+
+
+def _profiled_sync_call(call):
+    """Wrap a sync endpoint so the worker thread running it counts as working for the current profile"""
+    @functools.wraps(call)
+    def wrapper(*args, **kwargs):
+        profile = _current_profile.get()
+        if profile is None:
+            return call(*args, **kwargs)
+        profile.enter_thread()
+        try:
+            return call(*args, **kwargs)
+        finally:
+            profile.exit_thread()
+    
+    wrapper.profiled = True
+    return wrapper
+
+
+def instrument_routes(app) -> None:
+    """Mark entry and exit of sync endpoints in the threadpool for the sampler.
+    
+    Call after every router is included (only when profiling is enabled).
+    Async endpoints run in the request's own task and need no wrapping.
+    """
+    for route in app.routes:
+        dependant = getattr(route, "dependant", None)
+        if dependant is None or asyncio.iscoroutinefunction(dependant.call) or getattr(dependant.call, "profiled", False):
+            continue
+        dependant.call = _profiled_sync_call(dependant.call)
+        # The handler captured the call when the route was built
+        route.app = request_response(route.get_route_handler())
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling requests on demand.
+    
+    A request is profiled when it carries ``X-Profile: <admin token>`` or is
+    picked by ``sample_rate``. The profile ID is returned in the
+    ``X-Profile-Id`` response header and can be downloaded from /admin/profiles.
+    Only added to the app when profiling is enabled.
+    """
+    
+    def __init__(self, app, store: ProfileStore, sampler: StackSampler, admin_token: Optional[str], sample_rate: float = 0.0):
+        self.app = app
+        self.store = store
+        self.sampler = sampler
+        self.admin_token = admin_token
+        self.sample_rate = sample_rate
+    
+    def trigger_for(self, scope) -> Optional[str]:
+        if self.admin_token:
+            requested = dict(scope["headers"]).get(b"x-profile")
+            if requested is not None and token_matches(requested.decode("latin-1"), self.admin_token):
+                return "header"
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+    
+    async def __call__(self, scope, receive, send):
+        trigger = self.trigger_for(scope) if scope["type"] == "http" else None
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+        
+        profile = RequestProfile(scope["method"], scope["path"], trigger)
+        profile.bind_task()
+        token = _current_profile.set(profile)
+        status_code = None
+        
+        async def send_with_profile_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile.id.encode())]
+            await send(message)
+        
+        self.sampler.start_profile(profile)
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            self.sampler.stop_profile(profile)
+            profile.finish(status_code)
+            self.store.add(profile)
+            _current_profile.reset(token)
@@ -0,0 +1,21 @@
+import hmac
+from typing import Optional
+
+from fastapi import Header, HTTPException, status
+
+from src.core.config.database import get_config
+
+
+def token_matches(provided: str, expected: str) -> bool:
+    """Constant-time comparison of a provided token with the expected one"""
+    return hmac.compare_digest(provided.encode(), expected.encode())
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(default=None)) -> None:
+    """Dependency guarding admin endpoints with the ADMIN_TOKEN shared secret"""
+    expected = get_config().ADMIN_TOKEN
+    if not expected:
+        # Admin endpoints are disabled unless a token is configured
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if x_admin_token is None or not token_matches(x_admin_token, expected):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token")
@@ -0,0 +1,53 @@
+import threading
+from typing import Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine.default import CACHE_HIT, CACHE_MISS
+
+from src.core.metrics import metrics
+
+
+class StatementCacheStats:
+    """Counts how often executed statements found their compiled SQL in the engine cache.
+
+    Misses are expected once per statement shape after startup; a miss rate
+    that stays high means the cache (DB_QUERY_CACHE_SIZE) is too small or
+    statements are built with values baked into their structure.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.uncached = 0
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        if context is None:
+            return
+        cache_hit = getattr(context, "cache_hit", None)
+        with self._lock:
+            if cache_hit is CACHE_HIT:
+                self.hits += 1
+            elif cache_hit is CACHE_MISS:
+                self.misses += 1
+            else:
+                # Plain text SQL, DDL, or caching disabled
+                self.uncached += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            cached = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "uncached": self.uncached,
+                "hit_ratio": round(self.hits / cached, 4) if cached else 0.0,
+            }
+
+
+def install_statement_cache_metrics(engine) -> StatementCacheStats:
+    """Track compiled-statement cache hits for ``engine`` under the statement_cache metric"""
+    stats = StatementCacheStats()
+    event.listen(engine, "after_cursor_execute", stats.after_cursor_execute)
+    metrics.register("statement_cache", stats.snapshot)
+    return stats
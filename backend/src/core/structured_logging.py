@@ -0,0 +1,250 @@
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+# Correlation ID of the request being handled, and whether its low-level
+# (below WARNING) records are kept
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+_request_sampled: ContextVar[bool] = ContextVar("request_sampled", default=True)
+
+REQUEST_ID_HEADER = "x-request-id"
+
+# Keys whose values never reach the logs (Auth0 claims and credentials)
+REDACTED_FIELDS = {
+    "sub",
+    "email",
+    "name",
+    "given_name",
+    "family_name",
+    "first_name",
+    "last_name",
+    "nickname",
+    "picture",
+    "auth0_id",
+    "password",
+    "access_token",
+    "id_token",
+    "authorization",
+    "cookie",
+}
+REDACTED = "[REDACTED]"
+
+# Attributes every LogRecord has; anything else came in through ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "request_id"}
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional["NonBlockingQueueHandler"] = None
+
+
+def get_request_id() -> Optional[str]:
+    """Correlation ID of the current request, if any"""
+    return _request_id.get()
+
+
+def redact(value):
+    """Recursively replace values of sensitive keys in dicts and lists"""
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if str(key).lower() in REDACTED_FIELDS else redact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    return value
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, with ``extra`` fields redacted"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = REDACTED if key.lower() in REDACTED_FIELDS else redact(value)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        elif record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamps records with the request ID and drops unsampled low-level records"""
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        return record.levelno >= logging.WARNING or _request_sampled.get()
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Queue handler that never blocks the caller; records are dropped when the queue is full"""
+    
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message and traceback now, while the arguments and
+        # exception are still valid; JSON formatting happens on the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+    
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging(level: str = "INFO", queue_size: int = 10000) -> None:
+    """Route all logging through a bounded queue drained by a background thread"""
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+    
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JSONFormatter())
+    
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    _queue_handler = NonBlockingQueueHandler(log_queue)
+    _queue_handler.addFilter(RequestContextFilter())
+    
+    root = logging.getLogger()
+    root.handlers = [_queue_handler]
+    root.setLevel(level.upper())
+    
+    # Uvicorn installs its own stdout handlers; send its records through the queue too
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+    
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def restart_logging_after_fork() -> None:
+    """Give a forked worker its own log queue and listener thread.
+    
+    The parent's listener thread does not exist in the child, and the
+    parent's queue may have been forked while another thread held its lock.
+    """
+    global _listener
+    if _listener is None:
+        return
+    
+    log_queue: queue.Queue = queue.Queue(maxsize=_queue_handler.queue.maxsize)
+    _queue_handler.queue = log_queue
+    _listener = QueueListener(log_queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the background thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def install_slow_query_logging(engine, threshold_ms: float) -> None:
+    """Log statements slower than ``threshold_ms`` (without their parameters)"""
+    from sqlalchemy import event
+    
+    sql_logger = logging.getLogger("sqlalchemy.slow_query")
+    threshold = threshold_ms / 1000
+    
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        # On the execution context, so failed statements don't leave it behind
+        if context is not None:
+            context.slow_query_start = time.perf_counter()
+    
+    @event.listens_for(engine, "after_cursor_execute")
+    def log_if_slow(conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, "slow_query_start", None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        if elapsed >= threshold:
+            sql_logger.warning(
+                "Slow query",
+                extra={"duration_ms": round(elapsed * 1000, 2), "statement": statement},
+            )
+
+
+class RequestContextMiddleware:
+    """ASGI middleware assigning a correlation ID and log sampling decision per request.
+    
+    The ID is taken from an incoming X-Request-ID header when present and is
+    echoed back on the response. ``sample_rates`` maps paths to the fraction
+    of requests whose INFO/DEBUG records are kept; WARNING and above are
+    always logged.
+    """
+    
+    def __init__(self, app, sample_rates: Optional[Dict[str, float]] = None):
+        self.app = app
+        self.sample_rates = sample_rates or {}
+        self.logger = logging.getLogger("app.request")
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        headers = dict(scope["headers"])
+        request_id = headers.get(REQUEST_ID_HEADER.encode(), b"").decode("latin-1")[:128] or uuid.uuid4().hex
+        rate = self.sample_rates.get(scope["path"], 1.0)
+        id_token = _request_id.set(request_id)
+        sampled_token = _request_sampled.set(rate >= 1.0 or random.random() < rate)
+        
+        status_code = 500
+        started = time.perf_counter()
+        
+        async def send_with_request_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(REQUEST_ID_HEADER.encode(), request_id.encode())]
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            self.logger.log(
+                logging.WARNING if status_code >= 500 else logging.INFO,
+                "Request completed",
+                extra={
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status_code,
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+                },
+            )
+            _request_sampled.reset(sampled_token)
+            _request_id.reset(id_token)
@@ -0,0 +1,10 @@
+from sqlmodel import SQLModel, Field
+
+class CacheGeneration(SQLModel, table=True):
+    """Write counter of a table, shared by all processes caching its query results"""
+    
+    __tablename__ = "cache_generation"
+    
+    # Name of the table whose writes move the counter
+    name: str = Field(primary_key=True)
+    generation: int = Field(default=0)
@@ -0,0 +1,19 @@
+from sqlmodel import SQLModel, Field
+from typing import Optional
+from datetime import datetime
+
+class IdempotencyKey(SQLModel, table=True):
+    """Outcome of a request made with an Idempotency-Key header"""
+    
+    __tablename__ = "idempotency_key"
+    
+    # "<METHOD> <route>" the key was used on, so keys are scoped per endpoint
+    scope: str = Field(primary_key=True)
+    key: str = Field(primary_key=True, max_length=255)
+    # Hash of the request body; reusing a key with a different body is rejected
+    fingerprint: str
+    status: str = Field(default="in_progress")
+    response_status: Optional[int] = None
+    response_body: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    expires_at: datetime = Field(index=True)
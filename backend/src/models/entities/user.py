@@ -1,4 +1,5 @@
 from sqlmodel import SQLModel, Field
+from sqlalchemy import Index, text
 from typing import Optional
 from datetime import datetime
 from uuid import uuid4, UUID
@@ -6,6 +7,28 @@ from uuid import uuid4, UUID
 class User(SQLModel, table=True):
     """User entity model"""
     
+    # Partial indexes only cover active rows, so soft-deleted accounts don't
+    # bloat the indexes used by the default (active-only) lookups and lists.
+    __table_args__ = (
+        Index("ix_user_active_email", "email", postgresql_where=text("is_active"), sqlite_where=text("is_active")),
+        Index("ix_user_active_auth0_id", "auth0_id", postgresql_where=text("is_active"), sqlite_where=text("is_active")),
+        Index("ix_user_active_created_at_id", "created_at", "id", postgresql_where=text("is_active"), sqlite_where=text("is_active")),
+        # Change feed ordering key, covers inactive rows so soft deletes are synced
+        Index("ix_user_updated_at_id", "updated_at", "id"),
+        # Sorted/filtered listings (see LISTING_INDEXES in UserService)
+        Index("ix_user_created_at_id", "created_at", "id"),
+        Index("ix_user_active_updated_at_id", "updated_at", "id", postgresql_where=text("is_active"), sqlite_where=text("is_active")),
+        Index(
+            "ix_user_active_email_domain_created_at_id",
+            text("lower(split_part(email, '@', 2))"),
+            "created_at",
+            "id",
+            postgresql_where=text("is_active"),
+        ).ddl_if(dialect="postgresql"),
+        # Used by the archival job to find long-inactive users
+        Index("ix_user_inactive_updated_at_id", "updated_at", "id", postgresql_where=text("NOT is_active"), sqlite_where=text("NOT is_active")),
+    )
+    
     id: Optional[UUID] = Field(default_factory=uuid4, primary_key=True)
     email: str = Field(unique=True, index=True)
     username: Optional[str] = Field(default=None, unique=True, index=True)
@@ -15,6 +38,7 @@ class User(SQLModel, table=True):
     is_active: bool = Field(default=True)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
+    last_login: Optional[datetime] = Field(default=None)
     
     class Config:
-        table_name = "users" 
\ No newline at end of file
+        table_name = "users"
@@ -0,0 +1,21 @@
+from sqlmodel import SQLModel, Field
+from typing import Optional
+from datetime import datetime
+from uuid import UUID
+
+class UserArchive(SQLModel, table=True):
+    """Archived copy of a long-inactive user, moved out of the user table"""
+    
+    __tablename__ = "user_archive"
+    
+    id: UUID = Field(primary_key=True)
+    email: str = Field(index=True)
+    username: Optional[str] = None
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    auth0_id: Optional[str] = Field(default=None, index=True)
+    is_active: bool = Field(default=False)
+    created_at: datetime
+    updated_at: datetime
+    last_login: Optional[datetime] = None
+    archived_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1 @@
+# Lightweight read-only records
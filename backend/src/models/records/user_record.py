@@ -0,0 +1,62 @@
+from typing import Iterable, Optional
+
+from sqlalchemy import select
+
+from src.models.entities.user import User
+
+# Columns a UserRecord can carry, in UserResponse field order
+USER_RECORD_FIELDS = (
+    "id",
+    "email",
+    "username",
+    "first_name",
+    "last_name",
+    "auth0_id",
+    "is_active",
+    "created_at",
+    "updated_at",
+    "last_login",
+)
+
+
+def user_columns(fields: Iterable[str] = USER_RECORD_FIELDS):
+    """Core column objects of the user table for the given field names"""
+    table = User.__table__
+    return [table.c[name] for name in fields]
+
+
+def select_user_columns(fields: Iterable[str] = USER_RECORD_FIELDS):
+    """Core SELECT of only the given user columns (no ORM entity involved)"""
+    return select(*user_columns(fields))
+
+
+class UserRecord:
+    """Read-only user row produced by the projection query path.
+    
+    Unlike a User entity it is never registered in a session identity map
+    or tracked for changes, and serializes straight to a JSON-ready dict.
+    Fields that were not selected are absent rather than None.
+    """
+    
+    __slots__ = ("_fields",) + USER_RECORD_FIELDS
+    
+    def __init__(self, fields: tuple, values: tuple):
+        self._fields = fields
+        for name, value in zip(fields, values):
+            setattr(self, name, value)
+    
+    @classmethod
+    def from_rows(cls, rows, fields: tuple = USER_RECORD_FIELDS) -> list:
+        return [cls(fields, tuple(row)) for row in rows]
+    
+    def to_dict(self, fields: Optional[Iterable[str]] = None) -> dict:
+        """JSON-ready dict with the same encoding as UserResponse"""
+        result = {}
+        for name in fields or self._fields:
+            value = getattr(self, name)
+            if name == "id" and value is not None:
+                value = str(value)
+            elif name in ("created_at", "updated_at", "last_login") and value is not None:
+                value = value.isoformat()
+            result[name] = value
+        return result
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, EmailStr
 from typing import Optional
+from datetime import datetime
 
 class CreateUserRequest(BaseModel):
     """Request model for creating a new user"""
@@ -14,4 +15,13 @@ class UpdateUserRequest(BaseModel):
     username: Optional[str] = None
     first_name: Optional[str] = None
     last_name: Optional[str] = None
-    is_active: Optional[bool] = None 
\ No newline at end of file
+    is_active: Optional[bool] = None
+
+class UserListFilters(BaseModel):
+    """Whitelisted filters for listing users"""
+    is_active: Optional[bool] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+    updated_after: Optional[datetime] = None
+    updated_before: Optional[datetime] = None
+    email_domain: Optional[str] = None
@@ -14,6 +14,7 @@ class UserResponse(BaseModel):
     is_active: bool
     created_at: datetime
     updated_at: datetime
+    last_login: Optional[datetime] = None
 
 class CreateUserResponse(BaseModel):
     """Response model for user creation"""
@@ -27,4 +28,10 @@ class GetUserResponse(BaseModel):
 class ListUsersResponse(BaseModel):
     """Response model for listing users"""
     users: list[UserResponse]
-    total: int 
\ No newline at end of file
+    total: int
+
+class UserChangesResponse(BaseModel):
+    """Response model for the incremental user change feed"""
+    users: list[UserResponse]
+    next_cursor: Optional[str] = None
+    has_more: bool
@@ -0,0 +1,52 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import PlainTextResponse
+
+from src.core.metrics import metrics
+from src.core.security import require_admin_token
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin_token)])
+
+def get_profile_store(request: Request):
+    """Dependency to get the profile store (only present when profiling is enabled)"""
+    store = getattr(request.app.state, "profile_store", None)
+    if store is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profiling is not enabled"
+        )
+    return store
+
+@router.get("/metrics")
+def get_metrics():
+    """Snapshot of runtime metrics (query coalescing, admission limits, ...)"""
+    return metrics.snapshot()
+
+@router.get("/profiles")
+def list_profiles(store=Depends(get_profile_store)):
+    """List captured request profiles, newest first"""
+    return {"profiles": [profile.summary() for profile in store.list()]}
+
+@router.get("/profiles/{profile_id}")
+def get_profile(profile_id: str, store=Depends(get_profile_store)):
+    """Get a profile's metadata and SQL timeline"""
+    profile = store.get(profile_id)
+    if not profile:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    return profile.to_dict()
+
+@router.get("/profiles/{profile_id}/folded", response_class=PlainTextResponse)
+def download_folded_stacks(profile_id: str, store=Depends(get_profile_store)):
+    """Download the profile's stack samples in folded format for flamegraph tools"""
+    profile = store.get(profile_id)
+    if not profile:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    return PlainTextResponse(
+        profile.folded(),
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.folded"'},
+    )
@@ -1,91 +1,354 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
 from sqlmodel import Session
-from typing import List
+from typing import Callable, List, Optional
 from uuid import UUID
+from datetime import datetime, timedelta
+import anyio
+import json
+import time
 
-from src.core.config.database import get_session
-from src.services.user_service import UserService
-from src.models.requests.user_requests import CreateUserRequest, UpdateUserRequest
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from src.core.config.database import get_session, get_config
+from src.core.middleware.deadline import RequestDeadlineExceeded
+from src.core.middleware.draining import drain_state
+from src.core.exceptions.idempotency_exceptions import (
+    IdempotencyKeyReusedException,
+    IdempotencyKeyInProgressException,
+)
+from src.services.user_service import UserService, encode_change_cursor, parse_user_fields
+from src.services.user_page_cache import user_pages
+from src.services.idempotency_service import IdempotencyService, request_fingerprint
+from src.models.requests.user_requests import CreateUserRequest, UpdateUserRequest, UserListFilters
 from src.models.responses.user_responses import (
     UserResponse, 
     CreateUserResponse, 
     GetUserResponse, 
-    ListUsersResponse
+    ListUsersResponse,
+    UserChangesResponse
 )
 
+config = get_config()
+
 router = APIRouter(prefix="/users", tags=["users"])
 
-def get_user_service(db: Session = Depends(get_session)) -> UserService:
-    """Dependency to get user service"""
-    return UserService(db)
+def get_user_service(request: Request, db: Session = Depends(get_session)) -> UserService:
+    """Dependency to get user service.
+    
+    The session's connection goes back to the pool after each service call,
+    so handlers don't hold it while serializing the response.
+    """
+    return UserService(
+        db,
+        write_behind=getattr(request.app.state, "user_write_behind", None),
+        release_connections=True,
+    )
 
-@router.post("/", response_model=CreateUserResponse, status_code=status.HTTP_201_CREATED)
-def create_user(
-    user_data: CreateUserRequest,
-    user_service: UserService = Depends(get_user_service)
-):
-    """Create a new user"""
-    try:
-        user = user_service.create_user(user_data)
-        user_response = UserResponse.model_validate(user, from_attributes=True)
-        return CreateUserResponse(
-            message="User created successfully",
-            user=user_response
-        )
-    except ValueError as e:
+def get_idempotency_service(db: Session = Depends(get_session)) -> IdempotencyService:
+    """Dependency to get idempotency service (shares the request's session)"""
+    return IdempotencyService(
+        db,
+        ttl=timedelta(hours=config.IDEMPOTENCY_TTL_HOURS),
+        wait_seconds=config.IDEMPOTENCY_WAIT_SECONDS,
+        lock_seconds=config.IDEMPOTENCY_LOCK_SECONDS,
+    )
+
+def run_idempotent(
+    idempotency_service: IdempotencyService,
+    scope: str,
+    key: Optional[str],
+    payload: str,
+    handler: Callable[[Callable[[JSONResponse], None]], JSONResponse],
+) -> JSONResponse:
+    """Execute ``handler`` at most once per Idempotency-Key.
+    
+    ``handler`` gets a ``record(response)`` function to call inside the
+    transaction of its writes, before it commits, so the stored response
+    commits atomically with them. Replays return the stored response
+    without running the handler. Client errors (4xx) are stored and
+    replayed too. Server errors release the key so a retry can run the
+    request again.
+    """
+    if not key:
+        return handler(lambda response: None)
+    if len(key) > 255:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Idempotency-Key must be at most 255 characters"
+        )
+    
+    try:
+        stored = idempotency_service.begin(scope, key, request_fingerprint(payload))
+    except IdempotencyKeyReusedException as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
             detail=str(e)
         )
-    except Exception as e:
+    except IdempotencyKeyInProgressException as e:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to create user"
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e),
+            headers={"Retry-After": "1"}
         )
+    
+    if stored is not None:
+        return Response(
+            content=stored.body,
+            status_code=stored.status_code,
+            media_type="application/json",
+            headers={"Idempotent-Replayed": "true"}
+        )
+    
+    def record(response: JSONResponse) -> None:
+        idempotency_service.record(scope, key, response.status_code, response.body.decode())
+    
+    try:
+        response = handler(record)
+    except HTTPException as e:
+        if e.status_code < 500:
+            idempotency_service.complete(scope, key, e.status_code, json.dumps({"detail": e.detail}))
+        else:
+            idempotency_service.abandon(scope, key)
+        raise
+    except Exception:
+        idempotency_service.abandon(scope, key)
+        raise
+    
+    idempotency_service.complete(scope, key, response.status_code, response.body.decode())
+    return response
+
+@router.post("/", response_model=CreateUserResponse, status_code=status.HTTP_201_CREATED)
+def create_user(
+    user_data: CreateUserRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    user_service: UserService = Depends(get_user_service),
+    idempotency_service: IdempotencyService = Depends(get_idempotency_service)
+):
+    """Create a new user.
+    
+    Send an Idempotency-Key header to make retries safe: a repeated request
+    with the same key returns the original response.
+    """
+    def create(record: Callable[[JSONResponse], None]) -> JSONResponse:
+        responses = []
+        
+        def respond(user) -> None:
+            # Runs before the user is committed, so the idempotent response
+            # is stored in the same transaction
+            response = JSONResponse(
+                status_code=status.HTTP_201_CREATED,
+                content=jsonable_encoder(CreateUserResponse(
+                    message="User created successfully",
+                    user=UserResponse.model_validate(user, from_attributes=True)
+                ))
+            )
+            record(response)
+            responses.append(response)
+        
+        try:
+            user_service.create_user(user_data, before_commit=respond)
+            return responses[0]
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        except (PoolTimeoutError, RequestDeadlineExceeded):
+            # Turned into 503/504 by the app-level exception handlers
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to create user"
+            )
+    
+    return run_idempotent(idempotency_service, "POST /users/", idempotency_key, user_data.model_dump_json(), create)
+
+@router.get("/changes", response_model=UserChangesResponse)
+async def get_user_changes(
+    since: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    wait: float = Query(0, ge=0, le=config.USER_CHANGES_MAX_WAIT_SECONDS),
+    user_service: UserService = Depends(get_user_service)
+):
+    """Get users created, updated or soft-deleted after the ``since`` cursor.
+    
+    With ``wait`` > 0 the request long-polls: it is held until changes arrive
+    or ``wait`` seconds pass. The connection is returned to the pool between polls.
+    """
+    deadline = time.monotonic() + wait
+    while True:
+        try:
+            users, next_cursor = await run_in_threadpool(
+                user_service.get_user_changes,
+                since,
+                limit + 1,
+                config.USER_CHANGES_SETTLE_SECONDS,
+            )
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        
+        remaining = deadline - time.monotonic()
+        # Answer early on shutdown so long-polls don't hold up draining
+        if users or remaining <= 0 or drain_state.draining:
+            break
+        
+        # The service call already returned the connection to the pool
+        await anyio.sleep(min(config.USER_CHANGES_POLL_INTERVAL_SECONDS, remaining))
+    
+    has_more = len(users) > limit
+    if has_more:
+        users = users[:limit]
+        next_cursor = encode_change_cursor(users[-1].updated_at, users[-1].id)
+    
+    return UserChangesResponse(
+        users=[UserResponse.model_validate(user, from_attributes=True) for user in users],
+        next_cursor=next_cursor,
+        has_more=has_more
+    )
+
+# Read-only endpoints use the projection path and serialize the records
+# directly; the response models still describe the payload shape.
 
 @router.get("/{user_id}", response_model=GetUserResponse)
 def get_user(
     user_id: UUID,
+    include_inactive: bool = False,
     user_service: UserService = Depends(get_user_service)
 ):
     """Get a user by ID"""
-    user = user_service.get_user_by_id(user_id)
-    if not user:
+    record = user_service.get_user_record_by_id(user_id, include_inactive=include_inactive)
+    if not record:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+    return JSONResponse(content={"user": record.to_dict()})
+
+@router.post("/{user_id}/login", status_code=status.HTTP_202_ACCEPTED)
+def record_user_login(
+    user_id: UUID,
+    user_service: UserService = Depends(get_user_service)
+):
+    """Record a login for a user.
+    
+    The update is applied in the background, so last_login may lag by up
+    to the write-behind flush interval. Queued logins are accepted without
+    checking that the user exists, so the request needs no connection;
+    404 is only returned when the login had to be written synchronously.
+    """
+    if not user_service.record_login(user_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    user_response = UserResponse.model_validate(user, from_attributes=True)
-    return GetUserResponse(user=user_response)
+    return {"message": "Login recorded"}
 
 @router.get("/", response_model=ListUsersResponse)
 def get_users(
     skip: int = 0,
     limit: int = 100,
+    include_inactive: bool = False,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,email"),
+    sort: Optional[str] = Query(None, description="created_at, updated_at or email; prefix with - for descending"),
+    is_active: Optional[bool] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    updated_after: Optional[datetime] = None,
+    updated_before: Optional[datetime] = None,
+    email_domain: Optional[str] = None,
+    user_service: UserService = Depends(get_user_service)
+):
+    """Get users with pagination, optional field selection, filters and sorting.
+    
+    Only filter/sort combinations backed by an index are accepted. Pages
+    are served from the page cache until the next write to users.
+    """
+    filters = UserListFilters(
+        is_active=is_active,
+        created_after=created_after,
+        created_before=created_before,
+        updated_after=updated_after,
+        updated_before=updated_before,
+        email_domain=email_domain,
+    )
+    try:
+        selected = parse_user_fields(fields)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    # Keyed on the parsed parameters, so spelling variants share an entry
+    cache_key = ("GET /users/", skip, limit, include_inactive, selected, sort, filters.model_dump_json())
+    if user_pages.enabled:
+        # Through the service, so a hit doesn't keep a connection checked out
+        generation = user_service.current_generation()
+        body = user_pages.get(cache_key, generation)
+        if body is not None:
+            return Response(content=body, media_type="application/json", headers={"X-Cache": "HIT"})
+    
+    try:
+        records = user_service.list_user_records(
+            skip=skip,
+            limit=limit,
+            include_inactive=include_inactive,
+            fields=selected,
+            filters=filters,
+            sort=sort,
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    response = JSONResponse(content={
+        "users": [record.to_dict() for record in records],
+        "total": len(records),
+    })
+    if user_pages.enabled:
+        user_pages.put(cache_key, generation, response.body)
+        response.headers["X-Cache"] = "MISS"
+    return response
+
+@router.get("/by-auth0/{auth0_id}", response_model=GetUserResponse)
+def get_user_by_auth0_id(
+    auth0_id: str,
+    include_inactive: bool = False,
     user_service: UserService = Depends(get_user_service)
 ):
-    """Get all users with pagination"""
-    users = user_service.get_all_users(skip=skip, limit=limit)
-    user_responses = [
-        UserResponse.model_validate(user, from_attributes=True) 
-        for user in users
-    ]
-    
-    return ListUsersResponse(users=user_responses, total=len(user_responses))
+    """Get a user by Auth0 ID"""
+    record = user_service.get_user_record_by_auth0_id(auth0_id, include_inactive=include_inactive)
+    if not record:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+    return JSONResponse(content={"user": record.to_dict()})
 
 @router.get("/email/{email}", response_model=GetUserResponse)
 def get_user_by_email(
     email: str,
+    include_inactive: bool = False,
     user_service: UserService = Depends(get_user_service)
 ):
     """Get a user by email"""
-    user = user_service.get_user_by_email(email)
-    if not user:
+    record = user_service.get_user_record_by_email(email, include_inactive=include_inactive)
+    if not record:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    user_response = UserResponse.model_validate(user, from_attributes=True)
-    return GetUserResponse(user=user_response) 
\ No newline at end of file
+    return JSONResponse(content={"user": record.to_dict()})
@@ -0,0 +1,255 @@
+from sqlmodel import Session, select
+from sqlalchemy import delete, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+import hashlib
+import threading
+import time
+
+from src.models.entities.idempotency_key import IdempotencyKey
+from src.core.exceptions.idempotency_exceptions import (
+    IdempotencyKeyReusedException,
+    IdempotencyKeyInProgressException,
+)
+
+@dataclass(frozen=True)
+class StoredResponse:
+    """Response recorded for an idempotency key (status_code is None while still running)"""
+    fingerprint: str
+    status_code: Optional[int]
+    body: Optional[str]
+    expires_at: datetime
+
+
+class IdempotencyCache:
+    """In-process LRU front cache of completed responses, plus in-flight markers.
+    
+    Completed keys are replayed without touching the database. Duplicates
+    arriving at the same worker while the first request runs wait on its
+    event instead of polling the table.
+    """
+    
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._responses: "OrderedDict[Tuple[str, str], StoredResponse]" = OrderedDict()
+        self._in_flight: Dict[Tuple[str, str], threading.Event] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, scope: str, key: str) -> Optional[StoredResponse]:
+        with self._lock:
+            stored = self._responses.get((scope, key))
+            if stored is None:
+                return None
+            if stored.expires_at <= datetime.utcnow():
+                del self._responses[(scope, key)]
+                return None
+            self._responses.move_to_end((scope, key))
+            return stored
+    
+    def put(self, scope: str, key: str, stored: StoredResponse) -> None:
+        with self._lock:
+            self._responses[(scope, key)] = stored
+            self._responses.move_to_end((scope, key))
+            while len(self._responses) > self.max_entries:
+                self._responses.popitem(last=False)
+    
+    def claim(self, scope: str, key: str) -> Tuple[bool, threading.Event]:
+        """Mark a key as running in this process; returns (claimed, event)"""
+        with self._lock:
+            event = self._in_flight.get((scope, key))
+            if event is not None:
+                return False, event
+            event = threading.Event()
+            self._in_flight[(scope, key)] = event
+            return True, event
+    
+    def release(self, scope: str, key: str) -> None:
+        with self._lock:
+            event = self._in_flight.pop((scope, key), None)
+        if event is not None:
+            event.set()
+
+
+idempotency_cache = IdempotencyCache()
+
+
+def request_fingerprint(payload: str) -> str:
+    """Stable hash of a canonical request body"""
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class IdempotencyService:
+    """Service class recording and replaying responses for Idempotency-Key requests"""
+    
+    # Expired rows are purged opportunistically, at most this often per process
+    _last_purge = 0.0
+    
+    def __init__(
+        self,
+        db_session: Session,
+        ttl: timedelta = timedelta(hours=24),
+        wait_seconds: float = 10.0,
+        lock_seconds: float = 60.0,
+        purge_interval_seconds: float = 300.0,
+        cache: IdempotencyCache = idempotency_cache,
+    ):
+        self.db = db_session
+        self.ttl = ttl
+        self.wait_seconds = wait_seconds
+        self.lock_seconds = lock_seconds
+        self.purge_interval_seconds = purge_interval_seconds
+        self.cache = cache
+    
+    def begin(self, scope: str, key: str, fingerprint: str) -> Optional[StoredResponse]:
+        """Claim a key before executing the request.
+        
+        Returns the stored response when the key has already completed, in
+        which case the request must not be executed again. Returns None when
+        the caller now owns the key and must call ``complete`` or ``abandon``.
+        Concurrent duplicates wait for the first execution to finish.
+        """
+        self._maybe_purge()
+        deadline = time.monotonic() + self.wait_seconds
+        
+        while True:
+            stored = self.cache.get(scope, key)
+            if stored is not None:
+                return self._check_fingerprint(key, stored, fingerprint)
+            
+            claimed, event = self.cache.claim(scope, key)
+            if not claimed:
+                # Same key already running in this process
+                if not event.wait(max(0.0, deadline - time.monotonic())):
+                    raise IdempotencyKeyInProgressException(key)
+                continue
+            
+            try:
+                stored = self._claim_row(scope, key, fingerprint)
+            except Exception:
+                self.cache.release(scope, key)
+                raise
+            if stored is None:
+                return None
+            
+            self.cache.release(scope, key)
+            self._check_fingerprint(key, stored, fingerprint)
+            if stored.status_code is not None:
+                self.cache.put(scope, key, stored)
+                return stored
+            
+            # Running in another process; poll the table
+            if time.monotonic() >= deadline:
+                raise IdempotencyKeyInProgressException(key)
+            time.sleep(0.1)
+    
+    def record(self, scope: str, key: str, status_code: int, body: str) -> None:
+        """Stage the response of a request that owns the key in the session's open transaction.
+        
+        Call it before the transaction holding the request's own writes
+        commits, so the writes and the stored response land together: a
+        crash after that commit still replays the response instead of
+        running the request again.
+        """
+        row = self.db.get(IdempotencyKey, (scope, key))
+        if row is not None and row.status == "in_progress":
+            row.status = "completed"
+            row.response_status = status_code
+            row.response_body = body
+            self.db.add(row)
+    
+    def complete(self, scope: str, key: str, status_code: int, body: str) -> None:
+        """Record the response of a request that owns the key, unless it was already recorded"""
+        try:
+            self.record(scope, key, status_code, body)
+            self.db.commit()
+            row = self.db.get(IdempotencyKey, (scope, key))
+            if row is not None and row.status == "completed":
+                self.cache.put(
+                    scope, key,
+                    StoredResponse(row.fingerprint, row.response_status, row.response_body, row.expires_at),
+                )
+        finally:
+            self.cache.release(scope, key)
+    
+    def abandon(self, scope: str, key: str) -> None:
+        """Release a key whose request failed, so a retry can execute it again"""
+        try:
+            self.db.rollback()
+            self.db.execute(
+                delete(IdempotencyKey).where(
+                    IdempotencyKey.scope == scope,
+                    IdempotencyKey.key == key,
+                    IdempotencyKey.status == "in_progress",
+                )
+            )
+            self.db.commit()
+        finally:
+            self.cache.release(scope, key)
+    
+    def purge_expired(self, limit: int = 1000) -> int:
+        """Delete up to ``limit`` expired keys in one statement; returns the number deleted"""
+        expired = select(IdempotencyKey.scope, IdempotencyKey.key).where(
+            IdempotencyKey.expires_at < datetime.utcnow()
+        ).limit(limit)
+        deleted = self.db.execute(
+            delete(IdempotencyKey).where(tuple_(IdempotencyKey.scope, IdempotencyKey.key).in_(expired))
+        ).rowcount
+        self.db.commit()
+        return deleted
+    
+    def _maybe_purge(self) -> None:
+        now = time.monotonic()
+        if now - IdempotencyService._last_purge < self.purge_interval_seconds:
+            return
+        IdempotencyService._last_purge = now
+        self.purge_expired()
+    
+    def _claim_row(self, scope: str, key: str, fingerprint: str) -> Optional[StoredResponse]:
+        """Insert the in-progress row; return the existing outcome if the key is taken"""
+        now = datetime.utcnow()
+        self.db.add(IdempotencyKey(
+            scope=scope,
+            key=key,
+            fingerprint=fingerprint,
+            created_at=now,
+            expires_at=now + self.ttl,
+        ))
+        try:
+            self.db.commit()
+            return None
+        except IntegrityError:
+            self.db.rollback()
+        
+        row = self.db.get(IdempotencyKey, (scope, key), populate_existing=True)
+        if row is None:
+            # Purged or abandoned in the meantime; try again
+            return self._claim_row(scope, key, fingerprint)
+        
+        if row.status == "in_progress":
+            if row.fingerprint == fingerprint and row.created_at < now - timedelta(seconds=self.lock_seconds):
+                # The original owner died without finishing; take the key over
+                taken = self.db.execute(
+                    update(IdempotencyKey)
+                    .where(
+                        IdempotencyKey.scope == scope,
+                        IdempotencyKey.key == key,
+                        IdempotencyKey.status == "in_progress",
+                        IdempotencyKey.created_at == row.created_at,
+                    )
+                    .values(created_at=now, expires_at=now + self.ttl)
+                )
+                self.db.commit()
+                if taken.rowcount == 1:
+                    return None
+            return StoredResponse(row.fingerprint, None, None, row.expires_at)
+        
+        return StoredResponse(row.fingerprint, row.response_status, row.response_body, row.expires_at)
+    
+    @staticmethod
+    def _check_fingerprint(key: str, stored: StoredResponse, fingerprint: str) -> StoredResponse:
+        if stored.fingerprint != fingerprint:
+            raise IdempotencyKeyReusedException(key)
+        return stored
@@ -0,0 +1,79 @@
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+from src.core.metrics import metrics
+
+
+class _Call:
+    __slots__ = ("done", "result", "failed")
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.failed = False
+
+
+class SingleFlight:
+    """Collapses concurrent identical calls into one execution.
+    
+    The first caller for a key runs the function. Callers arriving while it
+    is in flight wait for its result instead of running their own query, so
+    only one pooled connection is used. Results are shared between threads,
+    so only use this for immutable values (e.g. UserRecord). Errors are not
+    shared: when the leader fails, each waiter runs the call itself.
+    """
+    
+    def __init__(self, name: str, wait_timeout: float = 30.0):
+        self.name = name
+        self.wait_timeout = wait_timeout
+        self.executed = 0
+        self.coalesced = 0
+        self.leader_failures = 0
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        metrics.register(f"single_flight.{name}", self.snapshot)
+    
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+        
+        if not leader:
+            if call.done.wait(self.wait_timeout) and not call.failed:
+                with self._lock:
+                    self.coalesced += 1
+                return call.result
+            # The leader is stuck, or failed for reasons that may be its own
+            # (its deadline, its client disconnecting): run the call for this
+            # caller instead of inheriting that failure
+            with self._lock:
+                self.executed += 1
+                if call.failed:
+                    self.leader_failures += 1
+            return fn()
+        
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException:
+            call.failed = True
+            raise
+        finally:
+            with self._lock:
+                self.executed += 1
+                del self._calls[key]
+            call.done.set()
+    
+    def snapshot(self) -> dict:
+        with self._lock:
+            total = self.executed + self.coalesced
+            return {
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "coalesced_ratio": round(self.coalesced / total, 4) if total else 0.0,
+                "leader_failures": self.leader_failures,
+                "in_flight": len(self._calls),
+            }
@@ -0,0 +1,65 @@
+from sqlmodel import Session, select
+from sqlalchemy import delete, insert
+from datetime import datetime, timedelta
+
+from src.models.entities.user import User
+from src.models.entities.user_archive import UserArchive
+from src.services.user_page_cache import user_generation
+
+# Columns copied verbatim from user into user_archive
+ARCHIVED_COLUMNS = [
+    "id",
+    "email",
+    "username",
+    "first_name",
+    "last_name",
+    "auth0_id",
+    "is_active",
+    "created_at",
+    "updated_at",
+    "last_login",
+]
+
+class UserArchiveService:
+    """Service class for moving long-inactive users out of the user table"""
+    
+    def __init__(self, db_session: Session):
+        self.db = db_session
+    
+    def archive_inactive_users(self, inactive_days: int = 90, chunk_size: int = 500) -> int:
+        """Move users deactivated more than ``inactive_days`` ago into user_archive.
+        
+        Rows are moved in chunks of ``chunk_size``, each chunk in its own
+        transaction, so the job never holds long locks on the user table.
+        Returns the total number of archived users.
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        
+        cutoff = datetime.utcnow() - timedelta(days=inactive_days)
+        archived = 0
+        
+        while True:
+            # Served by the partial ix_user_inactive_updated_at_id index
+            ids = self.db.exec(
+                select(User.id)
+                .where(~User.is_active, User.updated_at < cutoff)
+                .order_by(User.updated_at)
+                .limit(chunk_size)
+                .with_for_update(skip_locked=True)
+            ).all()
+            
+            if not ids:
+                break
+            
+            source = select(*[getattr(User, name) for name in ARCHIVED_COLUMNS]).where(User.id.in_(ids))
+            self.db.execute(insert(UserArchive).from_select(ARCHIVED_COLUMNS, source))
+            self.db.execute(delete(User).where(User.id.in_(ids)))
+            user_generation.commit(self.db)
+            
+            archived += len(ids)
+            
+            if len(ids) < chunk_size:
+                break
+        
+        return archived
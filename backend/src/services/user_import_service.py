@@ -0,0 +1,338 @@
+import csv
+import io
+import json
+import os
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from uuid import uuid4
+
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import Column, Integer, MetaData, String, Table, Uuid, and_, delete, exists, func, insert, literal, or_, select, true
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session
+
+from src.models.entities.user import User
+from src.models.records.user_record import USER_RECORD_FIELDS, user_columns
+from src.models.requests.user_requests import CreateUserRequest
+from src.services.user_page_cache import user_generation
+
+# Columns read from import files; anything else in a row is ignored
+IMPORT_FIELDS = ("email", "username", "first_name", "last_name", "auth0_id")
+
+# Columns an existing user gets from an imported row with the same email
+MERGED_FIELDS = ("username", "first_name", "last_name", "auth0_id")
+
+FILE_FORMATS = ("csv", "ndjson")
+
+_create_user_requests = TypeAdapter(List[CreateUserRequest])
+
+# Per-connection staging table; kept out of SQLModel.metadata so
+# create_all and Alembic never see it
+_staging_metadata = MetaData()
+user_import_staging = Table(
+    "user_import_staging",
+    _staging_metadata,
+    Column("id", Uuid, primary_key=True),
+    Column("row_number", Integer, nullable=False),
+    Column("email", String, nullable=False),
+    *[Column(name, String) for name in MERGED_FIELDS],
+    prefixes=["TEMPORARY"],
+)
+
+
+@dataclass
+class ImportCheckpoint:
+    """Progress of an import, saved after every committed batch"""
+    source: str
+    source_size: int
+    rows_done: int = 0
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    rejected: int = 0
+    completed: bool = False
+
+    @classmethod
+    def load(cls, path: str) -> Optional["ImportCheckpoint"]:
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return cls(**json.load(f))
+
+    def save(self, path: str) -> None:
+        # Write-then-rename so an interrupted save never leaves a torn file
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(asdict(self), f)
+        os.replace(temporary, path)
+
+
+def detect_format(path: str, file_format: Optional[str] = None) -> str:
+    file_format = file_format or ("csv" if path.lower().endswith(".csv") else "ndjson")
+    if file_format not in FILE_FORMATS:
+        raise ValueError(f"Unsupported format {file_format}. Allowed: {', '.join(FILE_FORMATS)}")
+    return file_format
+
+
+def read_user_rows(path: str, file_format: str) -> Iterator[dict]:
+    """Stream rows of an import file as dicts of IMPORT_FIELDS (empty values become None)"""
+    with open(path, newline="", encoding="utf-8") as f:
+        if file_format == "csv":
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for row in rows:
+            yield {name: (row.get(name) or None) for name in IMPORT_FIELDS}
+
+
+class UserImportService:
+    """Service class for offline bulk import and export of users"""
+
+    def __init__(self, db_session: Session):
+        self.db = db_session
+
+    @property
+    def _is_postgres(self) -> bool:
+        return self.db.get_bind().dialect.name == "postgresql"
+
+    # Import
+
+    def import_users(
+        self,
+        path: str,
+        file_format: Optional[str] = None,
+        batch_size: int = 5000,
+        checkpoint_path: Optional[str] = None,
+        rejects_path: Optional[str] = None,
+        restart: bool = False,
+    ) -> ImportCheckpoint:
+        """Import users from a CSV or NDJSON file, merging on email.
+
+        Rows are validated with the CreateUserRequest rules, loaded into a
+        temporary staging table (COPY on Postgres, executemany elsewhere)
+        and merged into the user table with one upsert per batch. New emails
+        are inserted; existing users get the imported username, names and
+        auth0_id. Invalid rows, and rows whose username or auth0_id belongs
+        to a different user, are counted as rejected and written to
+        ``rejects_path``.
+
+        Progress is checkpointed after every committed batch. A rerun with
+        the same checkpoint file skips the rows already done. A batch
+        interrupted before its checkpoint was saved is merged again, which
+        is harmless because the merge is idempotent.
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        file_format = detect_format(path, file_format)
+        checkpoint_path = checkpoint_path or f"{path}.checkpoint.json"
+        rejects_path = rejects_path or f"{path}.rejects.ndjson"
+        source_size = os.path.getsize(path)
+
+        checkpoint = None if restart else ImportCheckpoint.load(checkpoint_path)
+        if checkpoint is not None and (checkpoint.source, checkpoint.source_size) != (os.path.abspath(path), source_size):
+            raise ValueError(f"{checkpoint_path} belongs to a different file; pass restart=True to start over")
+        if checkpoint is None:
+            checkpoint = ImportCheckpoint(source=os.path.abspath(path), source_size=source_size)
+            if os.path.exists(rejects_path):
+                os.remove(rejects_path)
+        if checkpoint.completed:
+            return checkpoint
+
+        with open(rejects_path, "a", encoding="utf-8") as rejects:
+            batch: List[Tuple[int, dict]] = []
+            for row_number, row in enumerate(read_user_rows(path, file_format), start=1):
+                if row_number <= checkpoint.rows_done:
+                    continue
+                batch.append((row_number, row))
+                if len(batch) == batch_size:
+                    self._import_batch(batch, checkpoint, rejects)
+                    checkpoint.save(checkpoint_path)
+                    batch = []
+            if batch:
+                self._import_batch(batch, checkpoint, rejects)
+
+        checkpoint.completed = True
+        checkpoint.save(checkpoint_path)
+        return checkpoint
+
+    def _import_batch(self, batch: List[Tuple[int, dict]], checkpoint: ImportCheckpoint, rejects) -> None:
+        valid, invalid = self._validate(batch)
+
+        # One row per email (last wins) and no username/auth0_id shared
+        # between rows, since one upsert can't touch a row twice
+        by_email: Dict[str, Tuple[int, dict]] = {}
+        for row_number, row in valid:
+            by_email[row["email"]] = (row_number, row)
+        staged, claimed = [], {}
+        for row_number, row in by_email.values():
+            duplicate = next(
+                (name for name in ("username", "auth0_id")
+                 if row[name] is not None and claimed.setdefault((name, row[name]), row["email"]) != row["email"]),
+                None,
+            )
+            if duplicate:
+                invalid.append((row_number, row, [f"{duplicate} is used by another row in the batch"]))
+            else:
+                staged.append((row_number, row))
+
+        for row_number, row in self._stage_and_merge(staged, checkpoint):
+            invalid.append((row_number, row, ["username or auth0_id belongs to another user"]))
+
+        for row_number, row, errors in invalid:
+            rejects.write(json.dumps({"row": row_number, "errors": errors, "data": row}) + "\n")
+        rejects.flush()
+        checkpoint.rejected += len(invalid)
+        checkpoint.rows_done = batch[-1][0]
+
+    @staticmethod
+    def _validate(batch: List[Tuple[int, dict]]):
+        """Validate a whole batch with one TypeAdapter call; returns (valid, invalid) rows"""
+        rows = [row for _, row in batch]
+        errors_by_index: Dict[int, List[str]] = {}
+        try:
+            requests = _create_user_requests.validate_python(rows)
+        except ValidationError as e:
+            for error in e.errors():
+                index, *location = error["loc"]
+                errors_by_index.setdefault(index, []).append(f"{'.'.join(map(str, location))}: {error['msg']}")
+            good = [row for index, row in enumerate(rows) if index not in errors_by_index]
+            requests = _create_user_requests.validate_python(good)
+
+        valid_numbers = [row_number for index, (row_number, _) in enumerate(batch) if index not in errors_by_index]
+        valid = [(row_number, request.model_dump()) for row_number, request in zip(valid_numbers, requests)]
+        invalid = [(batch[index][0], batch[index][1], errors) for index, errors in errors_by_index.items()]
+        return valid, invalid
+
+    def _stage_and_merge(self, rows: List[Tuple[int, dict]], checkpoint: ImportCheckpoint) -> List[Tuple[int, dict]]:
+        """Merge staged rows into user in one transaction; returns the rows rejected for conflicts"""
+        connection = self.db.connection()
+        staging = user_import_staging
+        # Temporary tables live on one connection, and the session may get a
+        # different pooled connection for each batch
+        staging.create(connection, checkfirst=True)
+        connection.execute(delete(staging))
+        if rows:
+            staged = [
+                {"id": uuid4(), "row_number": row_number, **{name: row[name] for name in IMPORT_FIELDS}}
+                for row_number, row in rows
+            ]
+            if self._is_postgres:
+                self._copy_into_staging(staged)
+            else:
+                connection.execute(insert(staging), staged)
+
+        # Usernames and auth0_ids already taken by a user with another email
+        conflict = exists().where(
+            User.email != staging.c.email,
+            or_(
+                and_(staging.c.username.is_not(None), User.username == staging.c.username),
+                and_(staging.c.auth0_id.is_not(None), User.auth0_id == staging.c.auth0_id),
+            ),
+        )
+        conflicting = connection.execute(select(staging).where(conflict)).mappings().all()
+        connection.execute(delete(staging).where(conflict))
+
+        staged_count = connection.execute(select(func.count()).select_from(staging)).scalar()
+        existing = connection.execute(
+            select(func.count()).select_from(staging).join(User, User.email == staging.c.email)
+        ).scalar()
+
+        now = datetime.utcnow()
+        dialect_insert = postgresql.insert if self._is_postgres else sqlite.insert
+        source = select(
+            staging.c.id,
+            staging.c.email,
+            *[staging.c[name] for name in MERGED_FIELDS],
+            true(),
+            literal(now, User.created_at.type),
+            literal(now, User.updated_at.type),
+        ).where(true())  # SQLite needs a WHERE to parse INSERT ... SELECT ... ON CONFLICT
+        statement = dialect_insert(User).from_select(
+            ["id", "email", *MERGED_FIELDS, "is_active", "created_at", "updated_at"],
+            source,
+        )
+        # Missing values in the file keep what the user already has
+        merged = {name: func.coalesce(statement.excluded[name], getattr(User, name)) for name in MERGED_FIELDS}
+        statement = statement.on_conflict_do_update(
+            index_elements=[User.email],
+            set_={**merged, "updated_at": statement.excluded.updated_at},
+            # Leave unchanged users alone, so updated_at (and the change
+            # feed) only moves for real changes and reruns are no-ops
+            where=or_(*[getattr(User, name).is_distinct_from(value) for name, value in merged.items()]),
+        )
+        written = connection.execute(statement).rowcount
+        connection.execute(delete(staging))
+        user_generation.commit(self.db)
+
+        inserted = staged_count - existing
+        checkpoint.inserted += inserted
+        checkpoint.updated += written - inserted
+        checkpoint.unchanged += existing - (written - inserted)
+        return [(row["row_number"], {name: row[name] for name in IMPORT_FIELDS}) for row in conflicting]
+
+    def _copy_into_staging(self, rows: List[dict]) -> None:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        columns = [column.name for column in user_import_staging.columns]
+        for row in rows:
+            # Unquoted empty fields are NULL in COPY's CSV format
+            writer.writerow([str(row[name]) if row[name] is not None else None for name in columns])
+        buffer.seek(0)
+        sql = f"COPY user_import_staging ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+        _copy(self.db.connection(), sql, source=buffer)
+
+    # Export
+
+    def export_users(self, path: str, file_format: Optional[str] = None, include_inactive: bool = False) -> int:
+        """Stream users to a CSV or NDJSON file; returns the number of users written.
+
+        CSV exports from Postgres use COPY TO, so rows go straight from the
+        server to the file. Otherwise rows are streamed with a server-side
+        cursor in chunks.
+        """
+        file_format = detect_format(path, file_format)
+        statement = select(*user_columns()).order_by(User.created_at, User.id)
+        if not include_inactive:
+            statement = statement.where(User.is_active)
+
+        connection = self.db.connection()
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            if file_format == "csv" and self._is_postgres:
+                query = statement.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True})
+                return _copy(connection, f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)", target=f)
+
+            writer = csv.writer(f) if file_format == "csv" else None
+            if writer:
+                writer.writerow(USER_RECORD_FIELDS)
+            count = 0
+            result = connection.execution_options(stream_results=True, yield_per=1000).execute(statement)
+            for row in result:
+                values = dict(zip(USER_RECORD_FIELDS, row))
+                if writer:
+                    writer.writerow([values[name] for name in USER_RECORD_FIELDS])
+                else:
+                    f.write(json.dumps(values, default=str) + "\n")
+                count += 1
+            return count
+
+
+def _copy(connection, sql: str, source=None, target=None) -> int:
+    """Run a COPY through the DBAPI cursor (psycopg2 or psycopg 3); returns the row count"""
+    cursor = connection.connection.dbapi_connection.cursor()
+    try:
+        if hasattr(cursor, "copy_expert"):
+            # psycopg2
+            cursor.copy_expert(sql, source if source is not None else target)
+        else:
+            # psycopg 3
+            with cursor.copy(sql) as copy:
+                if source is not None:
+                    while data := source.read(65536):
+                        copy.write(data)
+                else:
+                    for data in copy:
+                        target.write(bytes(data).decode())
+        return cursor.rowcount
+    finally:
+        cursor.close()
@@ -0,0 +1,164 @@
+"""Result cache for user list pages, invalidated by a table generation.
+
+Every committed write to the user table moves the table to a new
+generation, and a cached page is only served for the generation it was
+built at. There is no per-key invalidation: a write makes every cached
+page stale at once, which suits listings that are read far more often
+than the table changes.
+"""
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from src.core.metrics import metrics
+from src.models.entities.cache_generation import CacheGeneration
+
+
+class TableGeneration:
+    """Write counter of one table.
+
+    By default the counter lives in this process, which is only coherent
+    when the process is the table's only writer. With ``shared`` it is the
+    table's cache_generation row, bumped in the writing transaction, so
+    writes made by other workers and by offline scripts invalidate this
+    process's cache too. That costs a primary-key read per cached request
+    and serializes writers on the counter row.
+    """
+
+    def __init__(self, name: str, shared: bool = False):
+        self.name = name
+        self.shared = shared
+        self._local = 0
+        self._lock = threading.Lock()
+
+    def current(self, connection) -> int:
+        """The generation a result read through ``connection`` (a Session or Connection) belongs to.
+
+        Read it before the query whose result is cached: a write that
+        commits in between leaves the result under an already stale
+        generation, never the other way round.
+        """
+        if not self.shared:
+            return self._local
+        generation = connection.execute(
+            select(CacheGeneration.generation).where(CacheGeneration.name == self.name)
+        ).scalar()
+        return generation or 0
+
+    def commit(self, connection) -> None:
+        """Commit a write to the table on ``connection`` (a Session or Connection).
+
+        The shared counter is bumped inside the transaction and the local one
+        only after it commits, so no reader sees the new generation with the
+        old rows.
+        """
+        if self.shared:
+            # One upsert, so concurrent first writers on a table created
+            # without migrations (no counter row yet) don't collide
+            bind = connection.get_bind() if isinstance(connection, Session) else connection
+            dialect_insert = postgresql.insert if bind.dialect.name == "postgresql" else sqlite.insert
+            statement = dialect_insert(CacheGeneration).values(name=self.name, generation=1)
+            connection.execute(statement.on_conflict_do_update(
+                index_elements=[CacheGeneration.name],
+                set_={"generation": CacheGeneration.generation + 1},
+            ))
+        connection.commit()
+        with self._lock:
+            self._local += 1
+
+
+class PageCache:
+    """LRU cache of serialized response bodies for a single table generation.
+
+    Only the body bytes count toward ``max_bytes``. Seeing a newer
+    generation drops every entry; a body built at an older generation than
+    the cache's is not stored. ``max_bytes`` of 0 disables the cache.
+    """
+
+    def __init__(self, name: str, max_bytes: int = 0):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._generation = 0
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        metrics.register(f"page_cache.{name}", self.snapshot)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, key: Hashable, generation: int) -> Optional[bytes]:
+        with self._lock:
+            if generation > self._generation:
+                self._reset(generation)
+            # Pages of an older generation are gone; a reader that saw the
+            # generation before a concurrent bump just misses
+            body = self._entries.get(key) if generation == self._generation else None
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key: Hashable, generation: int, body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if generation < self._generation:
+                return
+            if generation > self._generation:
+                self._reset(generation)
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = body
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every page and forget the generation (e.g. after the shared counter was reset)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._generation = 0
+
+    def _reset(self, generation: int) -> None:
+        if self._entries:
+            self.invalidations += 1
+        self._entries.clear()
+        self._bytes = 0
+        self._generation = generation
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "generation": self._generation,
+            }
+
+
+# Generation of the user table, moved by every write (UserService, the
+# write-behind queue, imports and archival), and the GET /users/ page cache.
+# Both are configured at startup; the cache is disabled until then.
+user_generation = TableGeneration("user")
+user_pages = PageCache("users")
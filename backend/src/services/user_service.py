@@ -1,24 +1,118 @@
 from sqlmodel import Session, select
-from typing import Optional, List
+from sqlalchemy import tuple_
+from typing import Callable, Optional, List, Tuple, Iterable
 from uuid import UUID
-from datetime import datetime
+from datetime import datetime, timedelta
+import base64
+import functools
 
 from src.models.entities.user import User
-from src.models.requests.user_requests import CreateUserRequest, UpdateUserRequest
+from src.models.records.user_record import UserRecord, USER_RECORD_FIELDS
+from src.services import user_statements
+from src.services.single_flight import SingleFlight
+from src.services.user_page_cache import user_generation
+from src.services.user_write_behind import UserWriteBehind
+from src.models.requests.user_requests import CreateUserRequest, UpdateUserRequest, UserListFilters
 from src.models.responses.user_responses import UserResponse
 
+def encode_change_cursor(updated_at: datetime, user_id: UUID) -> str:
+    """Encode an (updated_at, id) position in the change feed as an opaque cursor"""
+    raw = f"{updated_at.isoformat()}|{user_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_change_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """Decode a change feed cursor, raising ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        updated_at, user_id = raw.split("|", 1)
+        return datetime.fromisoformat(updated_at), UUID(user_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid change cursor")
+
+# Sorted/filtered listings that have an index to walk, keyed by
+# (is_active scope, filtered by email domain, sort column). Anything else
+# would need a full scan plus sort and is rejected.
+LISTING_INDEXES = {
+    ("active", False, "created_at"): "ix_user_active_created_at_id",
+    ("all", False, "created_at"): "ix_user_created_at_id",
+    ("active", False, "updated_at"): "ix_user_active_updated_at_id",
+    ("inactive", False, "updated_at"): "ix_user_inactive_updated_at_id",
+    ("all", False, "updated_at"): "ix_user_updated_at_id",
+    ("active", False, "email"): "ix_user_active_email",
+    ("all", False, "email"): "ix_user_email",
+    ("active", True, "created_at"): "ix_user_active_email_domain_created_at_id",
+}
+
+# Range filters may only constrain the column the listing is sorted by
+RANGE_FILTERS = {
+    "created_after": "created_at",
+    "created_before": "created_at",
+    "updated_after": "updated_at",
+    "updated_before": "updated_at",
+}
+
+# Concurrent identical record lookups (e.g. a login storm resolving the same
+# user) share one in-flight query
+user_lookups = SingleFlight("user_lookups")
+
+def releases_connection(method):
+    """Return the session's pooled connection when the outermost service call finishes.
+    
+    Only applies to services created with ``release_connections``. Results
+    are fully loaded by then, so the caller can serialize them without
+    holding a connection; ORM objects it gets back are detached. The
+    session checks a connection out again on its next query.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self._call_depth += 1
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self._call_depth -= 1
+            if self._call_depth == 0 and self.release_connections:
+                self.db.close()
+    return wrapper
+
+def parse_user_fields(fields: Optional[str]) -> tuple:
+    """Parse a comma-separated ``fields=`` selector, raising ValueError on unknown names"""
+    if not fields:
+        return USER_RECORD_FIELDS
+    names = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in USER_RECORD_FIELDS]
+    if unknown or not names:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(USER_RECORD_FIELDS)}")
+    return names
+
 class UserService:
     """Service class for user operations"""
     
-    def __init__(self, db_session: Session):
+    def __init__(
+        self,
+        db_session: Session,
+        write_behind: Optional[UserWriteBehind] = None,
+        release_connections: bool = False,
+    ):
         self.db = db_session
+        self.write_behind = write_behind
+        self.release_connections = release_connections
+        self._call_depth = 0
     
-    def create_user(self, user_data: CreateUserRequest) -> User:
-        """Create a new user"""
-        # Check if user with email already exists
-        existing_user = self.db.exec(
-            select(User).where(User.email == user_data.email)
-        ).first()
+    @releases_connection
+    def create_user(
+        self,
+        user_data: CreateUserRequest,
+        before_commit: Optional[Callable[[User], None]] = None,
+    ) -> User:
+        """Create a new user.
+        
+        ``before_commit`` is called with the new user inside the creating
+        transaction, for writes that must commit together with it (e.g. the
+        stored response of an idempotent request).
+        """
+        # Check if user with email already exists (including deactivated ones,
+        # since the email is unique across the whole table)
+        existing_user = self.get_user_by_email(user_data.email, include_inactive=True)
         
         if existing_user:
             raise ValueError(f"User with email {user_data.email} already exists")
@@ -36,30 +130,180 @@ class UserService:
         )
         
         self.db.add(user)
-        self.db.commit()
+        if before_commit is not None:
+            before_commit(user)
+        user_generation.commit(self.db)
         self.db.refresh(user)
         
         return user
     
-    def get_user_by_id(self, user_id: UUID) -> Optional[User]:
+    @releases_connection
+    def current_generation(self) -> int:
+        """Generation of the user table, for keying cached results (see user_page_cache)"""
+        return user_generation.current(self.db)
+    
+    # Hot lookups use the cached statements in user_statements
+    
+    @releases_connection
+    def get_user_by_id(self, user_id: UUID, include_inactive: bool = False) -> Optional[User]:
         """Get user by ID"""
-        return self.db.exec(select(User).where(User.id == user_id)).first()
+        return self.db.scalars(user_statements.user_lookup("id", include_inactive), {"value": user_id}).first()
     
-    def get_user_by_email(self, email: str) -> Optional[User]:
+    @releases_connection
+    def get_user_by_email(self, email: str, include_inactive: bool = False) -> Optional[User]:
         """Get user by email"""
-        return self.db.exec(select(User).where(User.email == email)).first()
+        return self.db.scalars(user_statements.user_lookup("email", include_inactive), {"value": email}).first()
     
-    def get_user_by_auth0_id(self, auth0_id: str) -> Optional[User]:
+    @releases_connection
+    def get_user_by_auth0_id(self, auth0_id: str, include_inactive: bool = False) -> Optional[User]:
         """Get user by Auth0 ID"""
-        return self.db.exec(select(User).where(User.auth0_id == auth0_id)).first()
+        return self.db.scalars(user_statements.user_lookup("auth0_id", include_inactive), {"value": auth0_id}).first()
+    
+    @releases_connection
+    def get_all_users(self, skip: int = 0, limit: int = 100, include_inactive: bool = False) -> List[User]:
+        """Get all users with pagination, ordered by creation time"""
+        statement = user_statements.users_page(include_inactive)
+        return self.db.scalars(statement, {"skip": skip, "limit": limit}).all()
+    
+    # Read-only projection path: Core selects of plain columns, returned as
+    # UserRecord objects that skip ORM hydration, the identity map and
+    # change tracking. Use for endpoints that only serialize the result.
+    
+    def _fetch_records(self, statement, params: dict, fields: tuple = USER_RECORD_FIELDS) -> List[UserRecord]:
+        return UserRecord.from_rows(self.db.connection().execute(statement, params), fields)
+    
+    def _fetch_one_record(self, column: str, value, include_inactive: bool) -> Optional[UserRecord]:
+        """Fetch a single record, coalescing with identical in-flight lookups"""
+        statement = user_statements.user_record_lookup(column, include_inactive)
+        def fetch():
+            records = self._fetch_records(statement, {"value": value})
+            return records[0] if records else None
+        return user_lookups.do((column, value, include_inactive), fetch)
+    
+    @releases_connection
+    def get_user_record_by_id(self, user_id: UUID, include_inactive: bool = False) -> Optional[UserRecord]:
+        """Get a read-only user record by ID"""
+        return self._fetch_one_record("id", user_id, include_inactive)
+    
+    @releases_connection
+    def get_user_record_by_email(self, email: str, include_inactive: bool = False) -> Optional[UserRecord]:
+        """Get a read-only user record by email"""
+        return self._fetch_one_record("email", email, include_inactive)
+    
+    @releases_connection
+    def get_user_record_by_auth0_id(self, auth0_id: str, include_inactive: bool = False) -> Optional[UserRecord]:
+        """Get a read-only user record by Auth0 ID"""
+        return self._fetch_one_record("auth0_id", auth0_id, include_inactive)
+    
+    @releases_connection
+    def list_user_records(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        include_inactive: bool = False,
+        fields: Iterable[str] = USER_RECORD_FIELDS,
+        filters: Optional[UserListFilters] = None,
+        sort: Optional[str] = None,
+    ) -> List[UserRecord]:
+        """Get a page of read-only user records.
+        
+        Only the requested ``fields`` are selected. ``sort`` is a column name,
+        optionally prefixed with ``-`` for descending order (default
+        ``created_at``, or ``updated_at`` for inactive users). Raises ValueError for filter/sort combinations
+        without a supporting index (see LISTING_INDEXES).
+        """
+        fields = tuple(fields)
+        filters = filters or UserListFilters()
+        
+        if filters.is_active is not None:
+            scope = "active" if filters.is_active else "inactive"
+        else:
+            scope = "all" if include_inactive else "active"
+        
+        if not sort:
+            # Inactive users are only indexed by when they were deactivated
+            sort = "updated_at" if scope == "inactive" else "created_at"
+        descending = sort.startswith("-")
+        sort_column = sort.lstrip("-")
+        by_domain = bool(filters.email_domain)
+        
+        if (scope, by_domain, sort_column) not in LISTING_INDEXES:
+            raise ValueError(
+                f"Sorting by {sort_column} is not supported for "
+                f"{scope} users{' filtered by email domain' if by_domain else ''}"
+            )
+        for name, column in RANGE_FILTERS.items():
+            if getattr(filters, name) is not None and column != sort_column:
+                raise ValueError(f"{name} requires sort={column}")
+        
+        params = {"skip": skip, "limit": limit}
+        range_filters = []
+        for name in RANGE_FILTERS:
+            value = getattr(filters, name)
+            if value is not None:
+                range_filters.append(name)
+                params[name] = value
+        
+        domain_filter = ""
+        if by_domain:
+            domain = filters.email_domain.lower().lstrip("@")
+            if self.db.get_bind().dialect.name == "postgresql":
+                # Matches the ix_user_active_email_domain_created_at_id expression
+                domain_filter = "split_part"
+                params["email_domain"] = domain
+            else:
+                domain_filter = "like"
+                # The domain is user input; match its % and _ literally
+                escaped = domain.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                params["email_pattern"] = f"%@{escaped}"
+        
+        statement = user_statements.user_records_page(
+            fields, scope, sort_column, descending, tuple(range_filters), domain_filter
+        )
+        return self._fetch_records(statement, params, fields)
     
-    def get_all_users(self, skip: int = 0, limit: int = 100) -> List[User]:
-        """Get all users with pagination"""
-        return self.db.exec(select(User).offset(skip).limit(limit)).all()
+    @releases_connection
+    def get_user_changes(
+        self,
+        since: Optional[str] = None,
+        limit: int = 100,
+        settle_seconds: float = 0,
+    ) -> Tuple[List[User], Optional[str]]:
+        """Get users created, updated or soft-deleted after a change cursor.
+        
+        Rows are returned in (updated_at, id) order, served by the
+        ix_user_updated_at_id index. Rows touched within the last
+        ``settle_seconds`` are held back so that a slower, concurrently
+        committing writer cannot land behind an already-issued cursor.
+        Returns the changed users and the cursor to resume from.
+        
+        The window is a heuristic, not a guarantee: ``updated_at`` comes from
+        the writing process's clock when the row is flushed, not from the
+        commit. A write whose transaction stays open longer than
+        ``settle_seconds``, or whose host clock lags by more than that, can
+        still commit behind a cursor a consumer already holds, and that
+        consumer never sees it. Consumers that cannot tolerate a missed
+        change should periodically resync from an older cursor.
+        """
+        statement = select(User)
+        if since:
+            statement = statement.where(tuple_(User.updated_at, User.id) > tuple_(*decode_change_cursor(since)))
+        if settle_seconds > 0:
+            statement = statement.where(User.updated_at <= datetime.utcnow() - timedelta(seconds=settle_seconds))
+        statement = statement.order_by(User.updated_at, User.id).limit(limit)
+        
+        users = self.db.exec(statement).all()
+        if not users:
+            return [], since
+        
+        last = users[-1]
+        return users, encode_change_cursor(last.updated_at, last.id)
     
+    @releases_connection
     def update_user(self, user_id: UUID, user_data: UpdateUserRequest) -> Optional[User]:
         """Update an existing user"""
-        user = self.get_user_by_id(user_id)
+        # Inactive users must stay reachable so they can be reactivated
+        user = self.get_user_by_id(user_id, include_inactive=True)
         if not user:
             return None
         
@@ -74,11 +318,37 @@ class UserService:
         user.updated_at = datetime.utcnow()
         
         self.db.add(user)
-        self.db.commit()
+        user_generation.commit(self.db)
         self.db.refresh(user)
         
         return user
     
+    @releases_connection
+    def record_login(self, user_id: UUID, logged_in_at: Optional[datetime] = None) -> bool:
+        """Record a login for a user.
+        
+        last_login is not critical, so it is handed to the write-behind queue
+        when one is running and only written synchronously when the queue is
+        unavailable or full. Queued logins don't touch the database: an
+        unknown id is accepted and its flush simply matches no row. Returns
+        False only when a synchronous write found no such user.
+        """
+        logged_in_at = logged_in_at or datetime.utcnow()
+        if self.write_behind is not None and self.write_behind.enqueue(user_id, last_login=logged_in_at):
+            return True
+        
+        user = self.get_user_by_id(user_id, include_inactive=True)
+        if not user:
+            return False
+        if user.last_login is None or logged_in_at > user.last_login:
+            user.last_login = logged_in_at
+        user.updated_at = datetime.utcnow()
+        
+        self.db.add(user)
+        user_generation.commit(self.db)
+        return True
+    
+    @releases_connection
     def delete_user(self, user_id: UUID) -> bool:
         """Delete a user (soft delete by setting is_active to False)"""
         user = self.get_user_by_id(user_id)
@@ -89,6 +359,6 @@ class UserService:
         user.updated_at = datetime.utcnow()
         
         self.db.add(user)
-        self.db.commit()
+        user_generation.commit(self.db)
         
-        return True 
\ No newline at end of file
+        return True 
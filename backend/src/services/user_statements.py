@@ -0,0 +1,125 @@
+"""Prebuilt statements for the hot UserService query shapes.
+
+Each query shape is built once, with bind parameters in place of values,
+and the same statement object is executed on every call. SQLAlchemy
+memoizes the cache key on the object, so a lookup skips building the
+expression tree, hashing it and compiling it; only the parameters change.
+
+Builders are memoized per shape with ``lru_cache``. Values must always be
+passed as parameters, never baked into a statement, or every call would
+add a new entry to both this cache and the engine's compiled cache.
+"""
+from functools import lru_cache
+from typing import Dict, Tuple
+
+from sqlalchemy import Select, bindparam, func, literal_column
+from sqlalchemy import select as core_select
+from sqlmodel import select
+
+from src.core.metrics import metrics
+from src.models.entities.user import User
+from src.models.records.user_record import USER_RECORD_FIELDS, user_columns
+
+# Columns single-user lookups may be keyed on; the value is bound as :value
+LOOKUP_COLUMNS = ("id", "email", "auth0_id")
+
+# Range filters of the listing page, bound under their own names
+RANGE_CONDITIONS = {
+    "created_after": lambda: User.created_at >= bindparam("created_after"),
+    "created_before": lambda: User.created_at < bindparam("created_before"),
+    "updated_after": lambda: User.updated_at >= bindparam("updated_after"),
+    "updated_before": lambda: User.updated_at < bindparam("updated_before"),
+}
+
+
+def _active_only(statement: Select, include_inactive: bool) -> Select:
+    if include_inactive:
+        return statement
+    # Bare is_active, as in the partial indexes on User
+    return statement.where(User.is_active)
+
+
+@lru_cache(maxsize=None)
+def user_lookup(column: str, include_inactive: bool = False) -> Select:
+    """SELECT of User entities by one column (ORM path, for code that modifies the user)"""
+    if column not in LOOKUP_COLUMNS:
+        raise ValueError(f"Cannot look users up by {column}")
+    statement = select(User).where(getattr(User, column) == bindparam("value"))
+    return _active_only(statement, include_inactive)
+
+
+@lru_cache(maxsize=None)
+def user_record_lookup(column: str, include_inactive: bool = False) -> Select:
+    """SELECT of all record columns of at most one user by one column (projection path)"""
+    if column not in LOOKUP_COLUMNS:
+        raise ValueError(f"Cannot look users up by {column}")
+    statement = core_select(*user_columns()).where(getattr(User, column) == bindparam("value"))
+    return _active_only(statement, include_inactive).limit(1)
+
+
+@lru_cache(maxsize=None)
+def users_page(include_inactive: bool = False) -> Select:
+    """SELECT of a page of User entities in creation order, bound as :skip and :limit"""
+    statement = _active_only(select(User), include_inactive)
+    return statement.order_by(User.created_at, User.id).offset(bindparam("skip")).limit(bindparam("limit"))
+
+
+@lru_cache(maxsize=256)
+def user_records_page(
+    fields: Tuple[str, ...] = USER_RECORD_FIELDS,
+    scope: str = "active",
+    sort_column: str = "created_at",
+    descending: bool = False,
+    range_filters: Tuple[str, ...] = (),
+    domain_filter: str = "",
+) -> Select:
+    """SELECT of a page of user records for GET /users/.
+
+    ``scope`` is active, inactive or all; ``range_filters`` names the
+    RANGE_CONDITIONS that apply. ``domain_filter`` is "split_part" for the
+    Postgres expression behind ix_user_active_email_domain_created_at_id
+    (bound as :email_domain), "like" for the portable fallback (bound as
+    :email_pattern), or empty. Paging is bound as :skip and :limit.
+    Validation of the combination is left to UserService.list_user_records.
+    """
+    statement = core_select(*user_columns(fields))
+    if scope == "active":
+        statement = statement.where(User.is_active)
+    elif scope == "inactive":
+        statement = statement.where(~User.is_active)
+
+    for name in range_filters:
+        statement = statement.where(RANGE_CONDITIONS[name]())
+
+    if domain_filter == "split_part":
+        # The constants are inlined rather than bound so the expression
+        # matches the index
+        email_domain = func.lower(func.split_part(User.email, literal_column("'@'"), literal_column("2")))
+        statement = statement.where(email_domain == bindparam("email_domain"))
+    elif domain_filter == "like":
+        # Wildcards in the bound pattern are escaped with a backslash
+        statement = statement.where(func.lower(User.email).like(bindparam("email_pattern"), escape="\\"))
+
+    order = [getattr(User, sort_column)]
+    if sort_column != "email":
+        # Tie-breaker; email is unique already
+        order.append(User.id)
+    statement = statement.order_by(*[column.desc() if descending else column for column in order])
+    return statement.offset(bindparam("skip")).limit(bindparam("limit"))
+
+
+def snapshot() -> Dict[str, dict]:
+    stats = {}
+    for builder in (user_lookup, user_record_lookup, users_page, user_records_page):
+        info = builder.cache_info()
+        calls = info.hits + info.misses
+        stats[builder.__name__] = {
+            "hits": info.hits,
+            "misses": info.misses,
+            "hit_ratio": round(info.hits / calls, 4) if calls else 0.0,
+            "size": info.currsize,
+        }
+    return stats
+
+
+metrics.register("user_statements", snapshot)
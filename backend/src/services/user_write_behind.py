@@ -0,0 +1,269 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional, Set
+from uuid import UUID
+
+from sqlalchemy import DateTime, Uuid, bindparam, cast, column, func, update, values
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
+
+from src.core.metrics import metrics
+from src.models.entities.user import User
+from src.services.user_page_cache import user_generation
+
+logger = logging.getLogger(__name__)
+
+# Columns that may be written behind; everything else goes through UserService
+WRITE_BEHIND_FIELDS = ("last_login",)
+
+
+def postgres_batch_update(rows, flushed_at: datetime):
+    """One UPDATE ... FROM (VALUES ...) writing a whole chunk of (user id, last_login) rows"""
+    # The casts type columns that may be entirely NULL
+    batch = values(
+        column("id", Uuid),
+        column("last_login", DateTime),
+        name="batch",
+    ).data(rows)
+    return (
+        update(User)
+        .where(User.id == cast(batch.c.id, Uuid))
+        .values(
+            last_login=func.greatest(User.last_login, cast(batch.c.last_login, DateTime)),
+            updated_at=flushed_at,
+        )
+    )
+
+
+class UserWriteBehind:
+    """Background writer for non-critical user updates.
+
+    Updates are held in memory keyed by user id, so repeated updates to the
+    same user collapse into one row (newest value wins). A daemon thread
+    flushes them in a single batched UPDATE once ``flush_size`` users are
+    pending or ``flush_interval`` seconds have passed, whichever comes first.
+
+    The buffer is bounded: when ``max_pending`` distinct users are waiting,
+    ``enqueue`` blocks for up to ``enqueue_timeout`` seconds and then returns
+    False, and the caller is expected to write synchronously instead.
+    A batch whose flush fails with a transient database error (connection
+    lost, pool exhausted) is put back once and retried with the next flush;
+    a second failure, or any other error, drops it. Pending updates are lost
+    if the process dies before a flush, so only use this for values that
+    are safe to lose.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        flush_size: int = 500,
+        flush_interval: float = 1.0,
+        max_pending: int = 10000,
+        enqueue_timeout: float = 0.05,
+    ):
+        if flush_size < 1 or max_pending < flush_size:
+            raise ValueError("max_pending must be at least flush_size, which must be at least 1")
+        self.engine = engine
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.enqueue_timeout = enqueue_timeout
+
+        self._pending: Dict[UUID, Dict[str, datetime]] = {}
+        # Users whose pending update already failed one flush
+        self._retrying: Set[UUID] = set()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+        self.enqueued = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.flushed_rows = 0
+        self.flush_batches = 0
+        self.flush_errors = 0
+        self.requeued = 0
+        self.dropped = 0
+        metrics.register("user_write_behind", self.snapshot)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="user-write-behind", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop the writer thread and flush whatever is still pending"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        # Anything enqueued after the thread's last flush, then the retry of
+        # whatever that flush put back
+        self.flush()
+        with self._cond:
+            retry = bool(self._pending)
+        if retry:
+            self.flush()
+
+    def enqueue(self, user_id: UUID, **fields: datetime) -> bool:
+        """Queue an update; returns False if the caller must write it itself"""
+        unknown = set(fields) - set(WRITE_BEHIND_FIELDS)
+        if unknown:
+            raise ValueError(f"Fields cannot be written behind: {', '.join(sorted(unknown))}")
+
+        with self._cond:
+            if not self.running or self._stopping:
+                self.rejected += 1
+                return False
+
+            pending = self._pending.get(user_id)
+            if pending is None:
+                deadline = time.monotonic() + self.enqueue_timeout
+                while len(self._pending) >= self.max_pending:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or self._stopping:
+                        self.rejected += 1
+                        return False
+                    self._cond.notify_all()
+                    self._cond.wait(remaining)
+                pending = self._pending.setdefault(user_id, {})
+            else:
+                self.coalesced += 1
+
+            for name, value in fields.items():
+                current = pending.get(name)
+                if current is None or value > current:
+                    pending[name] = value
+            self.enqueued += 1
+
+            if len(self._pending) >= self.flush_size:
+                self._cond.notify_all()
+            return True
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_interval
+                while not self._stopping and len(self._pending) < self.flush_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                stopping = self._stopping
+            self.flush()
+            if stopping:
+                return
+
+    def flush(self) -> int:
+        """Write all pending updates; returns the number of users written"""
+        with self._flush_lock:
+            with self._cond:
+                batch, self._pending = self._pending, {}
+                retrying, self._retrying = self._retrying, set()
+                # Wake producers blocked on a full buffer
+                self._cond.notify_all()
+            if not batch:
+                return 0
+
+            written = 0
+            items = list(batch.items())
+            for start in range(0, len(items), self.flush_size):
+                chunk = items[start:start + self.flush_size]
+                try:
+                    self._write(chunk)
+                except (OperationalError, PoolTimeoutError):
+                    self.flush_errors += 1
+                    self._requeue(chunk, retrying)
+                    continue
+                except Exception:
+                    self.flush_errors += 1
+                    self.dropped += len(chunk)
+                    logger.exception(
+                        "Write-behind flush failed, updates dropped",
+                        extra={"users": len(chunk)},
+                    )
+                    continue
+                written += len(chunk)
+
+            self.flushed_rows += written
+            self.flush_batches += 1
+            return written
+
+    def _requeue(self, chunk, retrying: Set[UUID]) -> None:
+        """Put a chunk that hit a transient error back, unless it already had its retry"""
+        retry = [(user_id, fields) for user_id, fields in chunk if user_id not in retrying]
+        dropped = len(chunk) - len(retry)
+        with self._cond:
+            # May briefly take the buffer past max_pending; producers keep
+            # waiting until the next flush drains it
+            for user_id, fields in retry:
+                pending = self._pending.setdefault(user_id, {})
+                # An update enqueued since the failed flush may be newer
+                for name, value in fields.items():
+                    current = pending.get(name)
+                    if current is None or value > current:
+                        pending[name] = value
+                self._retrying.add(user_id)
+            self.requeued += len(retry)
+            self.dropped += dropped
+        logger.warning(
+            "Write-behind flush failed, retrying with the next flush",
+            exc_info=True,
+            extra={"users": len(chunk), "requeued": len(retry), "dropped": dropped},
+        )
+
+    def _write(self, chunk) -> None:
+        # updated_at is stamped at flush time, not enqueue time, so the change
+        # feed (which only reads rows older than its settle window) sees them
+        flushed_at = datetime.utcnow()
+        rows = [(user_id, fields.get("last_login")) for user_id, fields in chunk]
+
+        with self.engine.connect() as conn:
+            if conn.dialect.name == "postgresql":
+                conn.execute(postgres_batch_update(rows, flushed_at))
+            else:
+                # SQLite has no column aliases on VALUES; fall back to executemany
+                statement = (
+                    update(User)
+                    .where(User.id == bindparam("user_id"))
+                    .values(
+                        last_login=func.coalesce(
+                            func.max(User.last_login, bindparam("last_login")),
+                            bindparam("last_login"),
+                            User.last_login,
+                        ),
+                        updated_at=flushed_at,
+                    )
+                )
+                conn.execute(
+                    statement,
+                    [{"user_id": user_id, "last_login": last_login} for user_id, last_login in rows],
+                )
+            user_generation.commit(conn)
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            pending = len(self._pending)
+        return {
+            "running": self.running,
+            "pending": pending,
+            "enqueued": self.enqueued,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+            "flushed_rows": self.flushed_rows,
+            "flush_batches": self.flush_batches,
+            "flush_errors": self.flush_errors,
+            "requeued": self.requeued,
+            "dropped": self.dropped,
+        }
@@ -0,0 +1,10 @@
+import os
+import tempfile
+
+# The app builds its engine from DATABASE_URL at import time, so point it at
+# a throwaway SQLite database before any test imports it
+_db_fd, _db_path = tempfile.mkstemp(suffix=".db", prefix="ui_ai_agent_test_")
+os.close(_db_fd)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_path}")
+os.environ.setdefault("ENVIRONMENT", "development")
+os.environ.setdefault("DEBUG", "false")
@@ -0,0 +1,135 @@
+import time
+from datetime import datetime, timedelta
+from uuid import UUID
+
+import anyio
+import httpx
+import pytest
+from sqlalchemy import event
+
+from main import app, admission
+from src.routes import user_routes
+from src.core.config.database import create_db_and_tables, engine
+from src.core.middleware.admission import AIMDLimiter, classify_request, db_latency
+
+
+@pytest.fixture
+def injected_db_latency():
+    """Make every statement take at least 200ms, like an overloaded Postgres"""
+    def slow_statement(conn, cursor, statement, parameters, context, executemany):
+        time.sleep(0.2)
+
+    create_db_and_tables()
+    db_latency.reset()
+    target = admission.target_latency_seconds
+    limits = {name: limiter.limit for name, limiter in admission.limiters.items()}
+    event.listen(engine, "before_cursor_execute", slow_statement)
+    yield
+    event.remove(engine, "before_cursor_execute", slow_statement)
+    db_latency.reset()
+    admission.target_latency_seconds = target
+    for name, limit in limits.items():
+        admission.limiters[name].limit = limit
+
+
+async def _fire(client, requests):
+    responses = []
+
+    async def one(method, path, **kwargs):
+        responses.append((path, await client.request(method, path, **kwargs)))
+
+    async with anyio.create_task_group() as task_group:
+        for method, path, kwargs in requests:
+            task_group.start_soon(lambda m=method, p=path, k=kwargs: one(m, p, **k))
+    return responses
+
+
+def test_classify_request():
+    assert classify_request("GET", "/health") == "critical"
+    assert classify_request("POST", "/users/") == "write"
+    assert classify_request("GET", "/users/") == "bulk"
+    assert classify_request("GET", "/users/changes") == "feed"
+    assert classify_request("GET", "/users/email/a@b.com") == "read"
+
+
+def test_aimd_limiter_backs_off_and_recovers():
+    limiter = AIMDLimiter(initial=10, minimum=2, maximum=20, backoff=0.5, cooldown=0)
+    assert limiter.try_acquire()
+    limiter.release(overloaded=True)
+    assert int(limiter.limit) == 5
+    for _ in range(50):
+        assert limiter.try_acquire()
+        limiter.release(overloaded=False)
+    assert limiter.limit > 5
+
+
+def test_sheds_bulk_listing_under_db_latency(injected_db_latency):
+    admission.target_latency_seconds = 0.05
+    bulk = admission.limiters["bulk"]
+    bulk.limit = 8
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            # First wave drives the DB latency average above target
+            first = await _fire(client, [("GET", "/users/", {})] * 16)
+            # Second wave: bulk listing competes with health checks and writes
+            second = await _fire(
+                client,
+                [("GET", "/users/", {})] * 16
+                + [("GET", "/health", {})] * 4
+                + [("POST", "/users/", {"json": {"email": f"load{i}@example.com"}}) for i in range(4)],
+            )
+        return first, second
+
+    first, second = anyio.run(scenario)
+
+    shed = [response for path, response in first + second if response.status_code == 503]
+    assert shed, "expected bulk requests to be shed"
+    assert all(response.headers["Retry-After"] for response in shed)
+
+    # The limit adapted down from its starting point
+    assert bulk.limit < 8
+
+    # Higher-priority traffic was not shed
+    assert all(response.status_code == 200 for path, response in second if path == "/health")
+    assert all(response.status_code == 201 for path, response in second if path == "/users/" and response.request.method == "POST")
+
+
+def test_failed_statements_leave_no_timing_state_on_the_connection():
+    create_db_and_tables()
+    with engine.connect() as connection:
+        for _ in range(3):
+            with pytest.raises(Exception):
+                connection.exec_driver_sql("SELECT * FROM no_such_table")
+            connection.rollback()
+        assert not any(name.endswith("query_start") for name in connection.info)
+
+
+def test_pending_long_poll_does_not_take_a_bulk_slot(monkeypatch):
+    create_db_and_tables()
+    monkeypatch.setattr(user_routes.config, "USER_CHANGES_POLL_INTERVAL_SECONDS", 0.05)
+    # Backed off as far as it goes
+    monkeypatch.setattr(admission.limiters["bulk"], "limit", 1.0)
+    since = user_routes.encode_change_cursor(datetime.utcnow() + timedelta(days=1), UUID(int=0))
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = {}
+
+            async def long_poll():
+                responses["changes"] = await client.get("/users/changes", params={"since": since, "wait": 1})
+
+            async with anyio.create_task_group() as task_group:
+                task_group.start_soon(long_poll)
+                await anyio.sleep(0.2)
+                in_flight = admission.limiters["feed"].in_flight
+                responses["listings"] = [await client.get("/users/") for _ in range(3)]
+        return responses, in_flight
+
+    responses, in_flight = anyio.run(scenario)
+
+    assert in_flight == 1
+    assert [response.status_code for response in responses["listings"]] == [200] * 3
+    assert responses["changes"].status_code == 200
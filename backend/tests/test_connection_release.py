@@ -0,0 +1,37 @@
+from sqlmodel import Session
+
+from src.core.config.database import create_db_and_tables, engine
+from src.core.metrics import metrics
+from src.models.requests.user_requests import CreateUserRequest
+from src.services.user_service import UserService
+
+
+def test_service_calls_return_the_connection_before_the_caller_serializes():
+    create_db_and_tables()
+    checkouts = metrics.snapshot()["db_pool"]["checkouts"]
+
+    with Session(engine) as session:
+        service = UserService(session, release_connections=True)
+        # Nothing has queried yet, so nothing is checked out
+        assert engine.pool.checkedout() == 0
+
+        user = service.create_user(CreateUserRequest(email="release@example.com", first_name="Ada"))
+        assert engine.pool.checkedout() == 0
+        # Loaded before the release, so reading it doesn't check out again
+        assert (user.email, user.first_name) == ("release@example.com", "Ada")
+
+        records = service.list_user_records(limit=10)
+        assert engine.pool.checkedout() == 0
+        assert any(record.email == "release@example.com" for record in records)
+
+    assert metrics.snapshot()["db_pool"]["checkouts"] > checkouts
+
+
+def test_service_without_release_holds_the_connection_until_the_session_closes():
+    create_db_and_tables()
+
+    with Session(engine) as session:
+        UserService(session).list_user_records(limit=10)
+        assert engine.pool.checkedout() == 1
+
+    assert engine.pool.checkedout() == 0
@@ -0,0 +1,90 @@
+import time
+
+import anyio
+import httpx
+import pytest
+from sqlalchemy import event
+
+from main import app, admission
+from src.core.config.database import create_db_and_tables, engine
+from src.core.middleware.draining import drain_state
+
+
+@pytest.fixture
+def slow_db():
+    """Make every statement take at least 100ms so requests are in flight during shutdown"""
+    def slow_statement(conn, cursor, statement, parameters, context, executemany):
+        time.sleep(0.1)
+
+    create_db_and_tables()
+    # Latency is injected on purpose here; don't let admission control shed it
+    target = admission.target_latency_seconds
+    admission.target_latency_seconds = 60
+    event.listen(engine, "before_cursor_execute", slow_statement)
+    yield
+    event.remove(engine, "before_cursor_execute", slow_statement)
+    admission.target_latency_seconds = target
+    drain_state.reset()
+
+
+def test_rolling_restart_loses_no_requests(slow_db):
+    """Restart the app under traffic, retrying rejected requests like a load balancer would"""
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            old_instance = app.router.lifespan_context(app)
+            await old_instance.__aenter__()
+
+            created = await client.post("/users/", json={"email": "restart@example.com"})
+            user_id = created.json()["user"]["id"]
+            login = await client.post(f"/users/{user_id}/login")
+            assert login.status_code == 202
+
+            in_flight, during_drain = [], []
+
+            async def request(results, path):
+                results.append((path, await client.get(path)))
+
+            async with anyio.create_task_group() as task_group:
+                for _ in range(8):
+                    task_group.start_soon(request, in_flight, f"/users/{user_id}")
+                await anyio.sleep(0.05)
+
+                # SIGTERM: the old instance drains while traffic keeps arriving
+                task_group.start_soon(old_instance.__aexit__, None, None, None)
+                await anyio.sleep(0.01)
+                for path in [f"/users/{user_id}"] * 8 + ["/ready"]:
+                    task_group.start_soon(request, during_drain, path)
+
+            # Shutdown has finished: pool closed, write-behind flushed
+            pool_checked_out = engine.pool.checkedout()
+
+            # The replacement instance takes the retried requests
+            new_instance = app.router.lifespan_context(app)
+            await new_instance.__aenter__()
+            retried = []
+            for path, response in during_drain:
+                if response.status_code == 503 and path != "/ready":
+                    retried.append(await client.get(path))
+            user = (await client.get(f"/users/{user_id}")).json()["user"]
+            await new_instance.__aexit__(None, None, None)
+
+        return in_flight, during_drain, retried, pool_checked_out, user
+
+    in_flight, during_drain, retried, pool_checked_out, user = anyio.run(scenario)
+
+    # Requests that were already running completed normally
+    assert [response.status_code for _, response in in_flight] == [200] * 8
+
+    # New requests were turned away with a retryable 503, and readiness failed
+    assert all(response.status_code == 503 for _, response in during_drain)
+    assert all(response.headers["Retry-After"] for _, response in during_drain)
+
+    # After one retry against the new instance, no client saw an error
+    errors = [response for response in retried if response.status_code != 200]
+    assert len(retried) == 8
+    assert errors == []
+
+    assert pool_checked_out == 0
+    assert user["last_login"] is not None
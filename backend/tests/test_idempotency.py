@@ -0,0 +1,141 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import anyio
+import httpx
+import pytest
+from sqlmodel import Session, select
+
+from main import app
+from src.core.config.database import create_db_and_tables, engine
+from src.models.entities.idempotency_key import IdempotencyKey
+from src.models.entities.user import User
+from src.services.idempotency_service import IdempotencyService, idempotency_cache
+
+
+@pytest.fixture(autouse=True)
+def tables():
+    create_db_and_tables()
+
+
+def _post(client, email, key):
+    return client.post("/users/", json={"email": email}, headers={"Idempotency-Key": key})
+
+
+def _users_with_email(email):
+    with Session(engine) as session:
+        return session.exec(select(User).where(User.email == email)).all()
+
+
+def test_retry_with_same_key_replays_the_original_response():
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            key = str(uuid4())
+            first = await _post(client, "replay@example.com", key)
+            retry = await _post(client, "replay@example.com", key)
+            # Without a key the duplicate is an error
+            duplicate = await client.post("/users/", json={"email": "replay@example.com"})
+        return first, retry, duplicate
+
+    first, retry, duplicate = anyio.run(scenario)
+
+    assert first.status_code == 201
+    assert retry.status_code == 201
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == first.json()
+    assert duplicate.status_code == 400
+    assert len(_users_with_email("replay@example.com")) == 1
+
+
+def test_reusing_a_key_with_a_different_payload_is_rejected():
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            key = str(uuid4())
+            first = await _post(client, "reuse-1@example.com", key)
+            reused = await _post(client, "reuse-2@example.com", key)
+        return first, reused
+
+    first, reused = anyio.run(scenario)
+
+    assert first.status_code == 201
+    assert reused.status_code == 422
+    assert _users_with_email("reuse-2@example.com") == []
+
+
+def test_concurrent_duplicates_create_one_user():
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            key = str(uuid4())
+            responses = []
+
+            async def post():
+                responses.append(await _post(client, "concurrent@example.com", key))
+
+            async with anyio.create_task_group() as task_group:
+                for _ in range(5):
+                    task_group.start_soon(post)
+        return responses
+
+    responses = anyio.run(scenario)
+
+    assert [response.status_code for response in responses] == [201] * 5
+    assert sum("Idempotent-Replayed" not in response.headers for response in responses) == 1
+    assert len({response.json()["user"]["id"] for response in responses}) == 1
+    assert len(_users_with_email("concurrent@example.com")) == 1
+
+
+def test_response_is_stored_with_the_user_when_the_process_dies_before_completing(monkeypatch):
+    """A crash between the user commit and complete() must still replay the 201"""
+    key = str(uuid4())
+
+    async def post():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await _post(client, "crash@example.com", key)
+
+    # The request "dies" right after the handler: complete() never runs
+    monkeypatch.setattr(IdempotencyService, "complete", lambda self, *args: None)
+    first = anyio.run(post)
+    monkeypatch.undo()
+    # A fresh process has no in-flight marker for the key
+    idempotency_cache.release("POST /users/", key)
+
+    with Session(engine) as session:
+        row = session.get(IdempotencyKey, ("POST /users/", key))
+        assert (row.status, row.response_status) == ("completed", 201)
+        # Even once the in-progress lock would have expired
+        row.created_at = datetime.utcnow() - timedelta(hours=1)
+        session.add(row)
+        session.commit()
+
+    retry = anyio.run(post)
+
+    assert first.status_code == 201
+    assert retry.status_code == 201
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == first.json()
+
+
+def test_purge_expired_deletes_in_one_bounded_statement():
+    now = datetime.utcnow()
+    with Session(engine) as session:
+        for index in range(5):
+            session.add(IdempotencyKey(
+                scope="purge-test",
+                key=f"expired-{index}",
+                fingerprint="x",
+                created_at=now - timedelta(days=2),
+                expires_at=now - timedelta(days=1),
+            ))
+        session.add(IdempotencyKey(scope="purge-test", key="live", fingerprint="x", expires_at=now + timedelta(days=1)))
+        session.commit()
+
+        service = IdempotencyService(session)
+        assert service.purge_expired(limit=3) == 3
+        service.purge_expired()
+        remaining = session.exec(select(IdempotencyKey.key).where(IdempotencyKey.scope == "purge-test")).all()
+
+    assert remaining == ["live"]
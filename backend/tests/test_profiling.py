@@ -0,0 +1,88 @@
+import threading
+import time
+
+import anyio
+import httpx
+from fastapi import FastAPI
+
+from src.core.profiling import ProfileStore, ProfilingMiddleware, RequestProfile, StackSampler, instrument_routes
+
+ADMIN_TOKEN = "profiling-test-token"
+
+
+def profiled_request_work():
+    time.sleep(0.3)
+
+
+def other_request_work():
+    time.sleep(0.3)
+
+
+def _build_app():
+    test_app = FastAPI()
+
+    @test_app.get("/profiled")
+    def profiled():
+        profiled_request_work()
+        return {}
+
+    @test_app.get("/other")
+    def other():
+        other_request_work()
+        return {}
+
+    @test_app.get("/other-async")
+    async def other_async():
+        # Blocks the event loop thread on purpose, as a slow async handler would
+        other_request_work()
+        return {}
+
+    instrument_routes(test_app)
+    store = ProfileStore(max_profiles=10)
+    test_app.add_middleware(
+        ProfilingMiddleware,
+        store=store,
+        sampler=StackSampler(interval_seconds=0.002),
+        admin_token=ADMIN_TOKEN,
+    )
+    return test_app, store
+
+
+def test_profile_only_samples_threads_while_they_run_the_request():
+    test_app, store = _build_app()
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=test_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = {}
+
+            async def get(path, headers=None):
+                responses[path] = await client.get(path, headers=headers or {})
+
+            async with anyio.create_task_group() as task_group:
+                task_group.start_soon(get, "/profiled", {"X-Profile": ADMIN_TOKEN})
+                await anyio.sleep(0.05)
+                task_group.start_soon(get, "/other")
+                await anyio.sleep(0.05)
+                task_group.start_soon(get, "/other-async")
+            # The same worker threads now serve other requests only
+            await get("/other")
+        return responses
+
+    responses = anyio.run(scenario)
+
+    profile = store.get(responses["/profiled"].headers["x-profile-id"])
+    assert profile.samples > 0
+    assert "profiled_request_work" in profile.folded()
+    assert "other_request_work" not in profile.folded()
+    assert all(response.status_code == 200 for response in responses.values())
+
+
+def test_nested_entries_keep_the_thread_attributed_until_the_last_exit():
+    profile = RequestProfile("GET", "/", "header")
+    profile.enter_thread()
+    profile.enter_thread()
+    profile.exit_thread()
+    assert profile.working_threads() == [threading.get_ident()]
+    profile.exit_thread()
+    assert profile.working_threads() == []
@@ -0,0 +1,156 @@
+import logging
+import time
+
+import anyio
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session
+
+from src.core import structured_logging
+from src.core.config.database import DATABASE_URL, engine
+from src.core.middleware import deadline as deadline_module
+from src.core.middleware.deadline import (
+    DeadlineMiddleware,
+    DeadlineQueuePool,
+    RequestDeadline,
+    RequestDeadlineExceeded,
+)
+
+# Counts forever; only an interrupt ends it
+ENDLESS_QUERY = text("WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT count(*) FROM c")
+
+
+def _deadline_app(budget_seconds):
+    test_app = FastAPI()
+    outcome = {}
+
+    @test_app.get("/endless")
+    def endless():
+        started = time.monotonic()
+        try:
+            with Session(engine) as session:
+                session.exec(ENDLESS_QUERY)
+        except OperationalError as error:
+            outcome["error"] = error
+        finally:
+            outcome["query_seconds"] = time.monotonic() - started
+        return {}
+
+    @test_app.get("/sleep")
+    def sleep():
+        time.sleep(1)
+        return {}
+
+    test_app.add_middleware(DeadlineMiddleware, default_seconds=budget_seconds)
+    return test_app, outcome
+
+
+def test_pool_wait_is_capped_at_the_remaining_deadline():
+    small_engine = create_engine(DATABASE_URL, poolclass=DeadlineQueuePool, pool_size=1, max_overflow=0, pool_timeout=10)
+    held = small_engine.connect()
+    token = deadline_module._current_deadline.set(RequestDeadline(0.2))
+    try:
+        started = time.monotonic()
+        with pytest.raises(RequestDeadlineExceeded):
+            small_engine.connect()
+        assert time.monotonic() - started < 2
+    finally:
+        deadline_module._current_deadline.reset(token)
+        held.close()
+        small_engine.dispose()
+
+
+def test_expired_deadline_answers_504():
+    test_app, _ = _deadline_app(budget_seconds=0.2)
+
+    async def request():
+        transport = httpx.ASGITransport(app=test_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/sleep")
+
+    response = anyio.run(request)
+
+    assert response.status_code == 504
+    assert response.json() == {"detail": "Request deadline exceeded"}
+
+
+def test_deadline_cancels_the_running_query():
+    test_app, outcome = _deadline_app(budget_seconds=0.3)
+
+    async def request():
+        transport = httpx.ASGITransport(app=test_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/endless")
+
+    response = anyio.run(request)
+
+    assert response.status_code == 504
+    assert "interrupted" in str(outcome["error"])
+    assert outcome["query_seconds"] < 3
+
+
+def test_client_disconnect_cancels_the_running_query():
+    test_app, outcome = _deadline_app(budget_seconds=30)
+    sent = []
+
+    async def scenario():
+        messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            await anyio.sleep(0.3)
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": "/endless",
+            "raw_path": b"/endless",
+            "root_path": "",
+            "query_string": b"",
+            "headers": [],
+            "client": ("test", 1),
+            "server": ("test", 80),
+        }
+        started = time.monotonic()
+        await test_app(scope, receive, send)
+        return time.monotonic() - started
+
+    elapsed = anyio.run(scenario)
+
+    assert "interrupted" in str(outcome["error"])
+    assert elapsed < 3
+    # Nobody is listening any more, so no response is sent
+    assert sent == []
+
+
+class _UncancellableConnection:
+    def cancel(self):
+        raise OSError("could not send cancel request")
+
+
+def test_failed_cancel_is_logged_with_the_request_id(caplog):
+    deadline = RequestDeadline(30)
+    deadline._connections.add(_UncancellableConnection())
+    token = structured_logging._request_id.set("req-cancel")
+    caplog.handler.addFilter(structured_logging.RequestContextFilter())
+    try:
+        with caplog.at_level(logging.WARNING, logger=deadline_module.__name__):
+            deadline.cancel("Request deadline exceeded")
+    finally:
+        structured_logging._request_id.reset(token)
+
+    (record,) = caplog.records
+    assert record.levelno == logging.WARNING
+    assert record.request_id == "req-cancel"
+    assert (record.reason, record.error) == ("Request deadline exceeded", "OSError: could not send cancel request")
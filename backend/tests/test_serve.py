@@ -0,0 +1,76 @@
+import asyncio
+import threading
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+import serve
+from serve import DrainingServer, Supervisor, bind_socket, pool_sizes
+
+
+def test_pool_sizes_split_the_budget_evenly():
+    assert pool_sizes(20, 4) == (5, 0)
+    assert pool_sizes(20, 1) == (20, 0)
+    # The remainder is left unused rather than overshooting
+    assert pool_sizes(10, 3) == (3, 0)
+
+
+def test_pool_sizes_reject_a_budget_below_the_worker_count():
+    with pytest.raises(ValueError, match="too small for 4 workers"):
+        pool_sizes(3, 4)
+
+
+def test_pool_sizes_never_exceed_the_budget():
+    for budget in range(1, 65):
+        for workers in range(1, budget + 1):
+            pool_size, max_overflow = pool_sizes(budget, workers)
+            assert pool_size >= 1
+            assert (pool_size + max_overflow) * workers <= budget
+
+
+def _supervisor(app=None, sock=None, max_requests=0, jitter=0):
+    return Supervisor(
+        app, engine=None, sock=sock, workers=1,
+        max_requests=max_requests, max_requests_jitter=jitter, graceful_timeout=1,
+    )
+
+
+def test_worker_request_limit_adds_jitter_and_zero_disables():
+    assert _supervisor(max_requests=0, jitter=5).worker_request_limit() is None
+    limits = {_supervisor(max_requests=10, jitter=3).worker_request_limit() for _ in range(200)}
+    assert limits == {10, 11, 12, 13}
+
+
+def test_worker_exits_after_its_request_limit(monkeypatch):
+    served = []
+    test_app = FastAPI()
+
+    @test_app.get("/")
+    def index():
+        served.append(1)
+        return {}
+
+    # Always the top of the jitter range: 2 + 1 requests
+    monkeypatch.setattr(serve.random, "randint", lambda low, high: high)
+    sock = bind_socket("127.0.0.1", 0)
+    port = sock.getsockname()[1]
+    server = DrainingServer(_supervisor(test_app, sock, max_requests=2, jitter=1).worker_config())
+    worker = threading.Thread(target=lambda: asyncio.run(server.serve(sockets=[sock])), daemon=True)
+    worker.start()
+    try:
+        def request():
+            # A new connection each time, like independent clients
+            return httpx.get(f"http://127.0.0.1:{port}/", headers={"Connection": "close"}).status_code
+
+        assert [request(), request()] == [200, 200]
+        worker.join(timeout=0.5)
+        assert worker.is_alive()
+        assert request() == 200
+        worker.join(timeout=5)
+        assert not worker.is_alive()
+        assert len(served) == 3
+    finally:
+        server.should_exit = True
+        worker.join(timeout=5)
+        sock.close()
@@ -0,0 +1,74 @@
+import threading
+import time
+
+from src.core.middleware.deadline import RequestDeadlineExceeded
+from src.services.single_flight import SingleFlight
+
+
+def _run_concurrently(flight, key, fns):
+    """Start one caller per fn, the first as leader, and collect results or errors"""
+    results = [None] * len(fns)
+
+    def call(index, fn):
+        try:
+            results[index] = ("ok", flight.do(key, fn))
+        except Exception as exc:
+            results[index] = ("error", exc)
+
+    threads = [threading.Thread(target=call, args=(index, fn)) for index, fn in enumerate(fns)]
+    threads[0].start()
+    time.sleep(0.05)  # let the leader get in flight
+    for thread in threads[1:]:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    flight = SingleFlight("test_coalescing")
+    executions = []
+
+    def slow_lookup():
+        executions.append(1)
+        time.sleep(0.2)
+        return "record"
+
+    results = _run_concurrently(flight, "user-1", [slow_lookup] * 5)
+
+    assert results == [("ok", "record")] * 5
+    assert len(executions) == 1
+    assert flight.snapshot()["coalesced"] == 4
+
+
+def test_waiters_run_the_call_themselves_when_the_leader_fails():
+    flight = SingleFlight("test_leader_failure")
+
+    def cancelled_leader():
+        time.sleep(0.2)
+        raise RequestDeadlineExceeded("Client disconnected")
+
+    def lookup():
+        return "record"
+
+    results = _run_concurrently(flight, "user-1", [cancelled_leader, lookup, lookup])
+
+    # Only the leader sees its own cancellation
+    assert results[0][0] == "error"
+    assert isinstance(results[0][1], RequestDeadlineExceeded)
+    assert results[1:] == [("ok", "record")] * 2
+    assert flight.snapshot()["leader_failures"] == 2
+
+
+def test_waiters_do_not_share_exception_objects():
+    flight = SingleFlight("test_distinct_errors")
+
+    def failing():
+        time.sleep(0.1)
+        raise ValueError("boom")
+
+    results = _run_concurrently(flight, "user-1", [failing] * 3)
+
+    errors = [error for status, error in results if status == "error"]
+    assert len(errors) == 3
+    assert len({id(error) for error in errors}) == 3
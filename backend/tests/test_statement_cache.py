@@ -0,0 +1,21 @@
+from sqlalchemy import create_engine, select
+
+from src.core.config.database import DATABASE_URL, create_db_and_tables
+from src.core.statement_cache import install_statement_cache_metrics
+from src.models.entities.user import User
+
+
+def test_counts_compiled_cache_hits_and_misses_from_execution_events():
+    create_db_and_tables()
+    engine = create_engine(DATABASE_URL)
+    stats = install_statement_cache_metrics(engine)
+    try:
+        with engine.connect() as connection:
+            for _ in range(3):
+                connection.execute(select(User.id).where(User.email == "cache@example.com")).all()
+    finally:
+        engine.dispose()
+
+    snapshot = stats.snapshot()
+    assert (snapshot["misses"], snapshot["hits"]) == (1, 2)
+    assert snapshot["hit_ratio"] == round(2 / 3, 4)
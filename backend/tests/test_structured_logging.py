@@ -0,0 +1,134 @@
+import json
+import logging
+import queue
+import time
+
+import anyio
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.core.structured_logging import (
+    REDACTED,
+    JSONFormatter,
+    NonBlockingQueueHandler,
+    RequestContextFilter,
+    RequestContextMiddleware,
+)
+
+
+class CapturingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def captured():
+    """Records of the endpoint and request-summary loggers, after the request context filter"""
+    handler = CapturingHandler()
+    handler.addFilter(RequestContextFilter())
+    for name in ("test.request", "app.request"):
+        logger = logging.getLogger(name)
+        logger.addHandler(handler)
+        logger.propagate = False
+        logger.setLevel(logging.DEBUG)
+    yield handler.records
+    for name in ("test.request", "app.request"):
+        logger = logging.getLogger(name)
+        logger.removeHandler(handler)
+        logger.propagate = True
+        logger.setLevel(logging.NOTSET)
+
+
+def _app():
+    test_app = FastAPI()
+    logger = logging.getLogger("test.request")
+
+    @test_app.get("/chatty")
+    async def chatty():
+        logger.info("details")
+        logger.warning("problem")
+        return {}
+
+    test_app.add_middleware(RequestContextMiddleware, sample_rates={"/chatty": 0.0})
+    return test_app
+
+
+def _get(test_app, path, headers=None):
+    async def request():
+        transport = httpx.ASGITransport(app=test_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(path, headers=headers or {})
+
+    return anyio.run(request)
+
+
+def test_claims_are_redacted_at_any_depth_and_case():
+    record = logging.getLogger("test.redaction").makeRecord(
+        "test.redaction", logging.INFO, __file__, 1, "Token verified", None, None,
+        extra={
+            "claims": {
+                "Email": "ada@example.com",
+                "SUB": "auth0|123",
+                "app_metadata": {"Given_Name": "Ada", "roles": ["admin"]},
+                "identities": [{"user_id": "1", "Access_Token": "secret"}],
+            },
+            "email": "ada@example.com",
+            "plan": "pro",
+        },
+    )
+
+    entry = json.loads(JSONFormatter().format(record))
+
+    assert entry["claims"] == {
+        "Email": REDACTED,
+        "SUB": REDACTED,
+        "app_metadata": {"Given_Name": REDACTED, "roles": ["admin"]},
+        "identities": [{"user_id": "1", "Access_Token": REDACTED}],
+    }
+    assert entry["email"] == REDACTED
+    assert entry["plan"] == "pro"
+    assert "ada@example.com" not in json.dumps(entry)
+
+
+def test_full_queue_drops_and_counts_records_instead_of_blocking():
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=2))
+    logger = logging.getLogger("test.queue")
+    logger.addHandler(handler)
+    logger.propagate = False
+    try:
+        started = time.monotonic()
+        for index in range(5):
+            logger.warning("record %d", index)
+        elapsed = time.monotonic() - started
+    finally:
+        logger.removeHandler(handler)
+        logger.propagate = True
+
+    assert handler.dropped == 3
+    assert handler.queue.qsize() == 2
+    # Formatted before queueing, so the listener never sees the arguments
+    assert handler.queue.get_nowait().msg == "record 0"
+    assert elapsed < 1
+
+
+def test_sampled_out_path_keeps_warnings_only(captured):
+    response = _get(_app(), "/chatty")
+
+    assert response.status_code == 200
+    # "details" and the INFO "Request completed" are sampled out
+    assert [record.getMessage() for record in captured] == ["problem"]
+
+
+def test_incoming_request_id_is_echoed_and_stamped_on_records(captured):
+    response = _get(_app(), "/chatty", headers={"X-Request-ID": "req-from-proxy"})
+    generated = _get(_app(), "/chatty")
+
+    assert response.headers["x-request-id"] == "req-from-proxy"
+    assert captured[0].request_id == "req-from-proxy"
+    # Without one, a fresh ID is generated
+    assert generated.headers["x-request-id"] not in ("", "req-from-proxy")
@@ -0,0 +1,43 @@
+import math
+from datetime import datetime, timedelta
+
+from sqlmodel import Session, select
+
+from src.core.config.database import create_db_and_tables, engine
+from src.models.entities.user import User
+from src.models.entities.user_archive import UserArchive
+from src.services import user_archive_service
+from src.services.user_archive_service import UserArchiveService
+
+
+def test_archives_long_inactive_users_in_chunks(monkeypatch):
+    create_db_and_tables()
+    long_ago = datetime.utcnow() - timedelta(days=200)
+    stale = [User(email=f"archive-stale-{index}@example.com", is_active=False, updated_at=long_ago) for index in range(5)]
+    recently_deactivated = User(email="archive-recent@example.com", is_active=False)
+    old_but_active = User(email="archive-active@example.com", updated_at=long_ago)
+    with Session(engine) as session:
+        session.add_all([*stale, recently_deactivated, old_but_active])
+        session.commit()
+        stale_ids = {user.id for user in stale}
+        kept_ids = {recently_deactivated.id, old_but_active.id}
+
+    # One commit per chunk
+    commits = []
+    commit = user_archive_service.user_generation.commit
+    monkeypatch.setattr(user_archive_service.user_generation, "commit", lambda session: commits.append(1) or commit(session))
+
+    with Session(engine) as session:
+        archived = UserArchiveService(session).archive_inactive_users(inactive_days=90, chunk_size=2)
+
+    with Session(engine) as session:
+        remaining = set(session.exec(select(User.id)).all())
+        archive = session.exec(select(UserArchive).where(UserArchive.id.in_(stale_ids))).all()
+
+    # Earlier tests may have left long-inactive users of their own
+    assert archived >= len(stale)
+    assert len(commits) == math.ceil(archived / 2)
+    assert {row.id for row in archive} == stale_ids
+    assert all(row.email.startswith("archive-stale-") and not row.is_active for row in archive)
+    assert not stale_ids & remaining
+    assert kept_ids <= remaining
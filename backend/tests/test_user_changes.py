@@ -0,0 +1,115 @@
+import time
+from datetime import datetime, timedelta
+from uuid import UUID
+
+import anyio
+import httpx
+import pytest
+from sqlmodel import Session
+
+from main import app
+from src.core.config.database import create_db_and_tables, engine
+from src.models.entities.user import User
+from src.routes import user_routes
+from src.services.user_service import UserService, encode_change_cursor
+
+
+@pytest.fixture(autouse=True)
+def tables():
+    create_db_and_tables()
+
+
+@pytest.fixture
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(user_routes.config, "USER_CHANGES_POLL_INTERVAL_SECONDS", 0.05)
+    monkeypatch.setattr(user_routes.config, "USER_CHANGES_SETTLE_SECONDS", 0)
+
+
+def _add_users(*users):
+    with Session(engine) as session:
+        for user in users:
+            session.add(user)
+        session.commit()
+        return [user.id for user in users]
+
+
+def test_cursor_pages_through_changes_in_order_without_repeats():
+    # Far in the past, so every other row sorts after these
+    changed_at = datetime(2001, 1, 1)
+    ids = _add_users(
+        User(email="changes-1@example.com", updated_at=changed_at, id=UUID(int=2)),
+        User(email="changes-2@example.com", updated_at=changed_at, id=UUID(int=1)),
+        User(email="changes-3@example.com", updated_at=changed_at + timedelta(seconds=1), is_active=False),
+    )
+    start = encode_change_cursor(changed_at - timedelta(seconds=1), UUID(int=0))
+
+    with Session(engine) as session:
+        service = UserService(session)
+        first_page, cursor = service.get_user_changes(since=start, limit=2)
+        second_page, _ = service.get_user_changes(since=cursor, limit=2)
+
+    # Ties on updated_at are broken by id; soft-deleted rows are included
+    assert [user.id for user in first_page] == [UUID(int=1), UUID(int=2)]
+    assert second_page[0].id == ids[2]
+    assert not second_page[0].is_active
+
+
+def test_settle_window_holds_back_fresh_changes():
+    before = datetime.utcnow() - timedelta(milliseconds=1)
+    (user_id,) = _add_users(User(email="changes-fresh@example.com"))
+    since = encode_change_cursor(before, UUID(int=0))
+
+    with Session(engine) as session:
+        service = UserService(session)
+        settling, settling_cursor = service.get_user_changes(since=since, settle_seconds=5)
+        settled, _ = service.get_user_changes(since=since, limit=1)
+
+    assert user_id not in [user.id for user in settling]
+    # Nothing was served, so the cursor doesn't move past the held-back row
+    assert settling_cursor == since
+    assert [user.id for user in settled] == [user_id]
+
+
+def test_wait_holds_the_request_until_a_change_arrives(fast_polling):
+    since = encode_change_cursor(datetime.utcnow(), UUID(int=0))
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            result = {}
+
+            async def poll():
+                started = time.monotonic()
+                result["response"] = await client.get("/users/changes", params={"since": since, "wait": 5})
+                result["elapsed"] = time.monotonic() - started
+
+            async with anyio.create_task_group() as task_group:
+                task_group.start_soon(poll)
+                await anyio.sleep(0.3)
+                created = await client.post("/users/", json={"email": "changes-longpoll@example.com"})
+        return result, created
+
+    result, created = anyio.run(scenario)
+
+    assert created.status_code == 201
+    body = result["response"].json()
+    assert [user["email"] for user in body["users"]] == ["changes-longpoll@example.com"]
+    assert body["next_cursor"] != since
+    assert 0.3 <= result["elapsed"] < 5
+
+
+def test_wait_returns_the_same_cursor_when_nothing_changes(fast_polling):
+    since = encode_change_cursor(datetime.utcnow() + timedelta(days=1), UUID(int=0))
+
+    async def poll():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            started = time.monotonic()
+            response = await client.get("/users/changes", params={"since": since, "wait": 0.3})
+            return response, time.monotonic() - started
+
+    response, elapsed = anyio.run(poll)
+
+    assert response.status_code == 200
+    assert response.json() == {"users": [], "next_cursor": since, "has_more": False}
+    assert elapsed >= 0.3
@@ -0,0 +1,115 @@
+import csv
+import json
+
+import pytest
+from sqlmodel import Session, select
+
+from src.core.config.database import create_db_and_tables, engine
+from src.models.entities.user import User
+from src.services.user_import_service import IMPORT_FIELDS, ImportCheckpoint, UserImportService
+
+
+@pytest.fixture(autouse=True)
+def tables():
+    create_db_and_tables()
+
+
+def _write_csv(path, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=IMPORT_FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+    return str(path)
+
+
+def _import(path, **kwargs):
+    with Session(engine) as session:
+        return UserImportService(session).import_users(path, **kwargs)
+
+
+def _user(email):
+    with Session(engine) as session:
+        return session.exec(select(User).where(User.email == email)).first()
+
+
+def test_import_merges_on_email_and_writes_rejects(tmp_path):
+    with Session(engine) as session:
+        session.add(User(email="import-existing@example.com", first_name="Old", last_name="Kept"))
+        session.add(User(email="import-owner@example.com", username="import-taken"))
+        session.commit()
+
+    path = _write_csv(tmp_path / "users.csv", [
+        {"email": "import-new@example.com", "first_name": "New"},
+        # Empty last_name keeps the stored one
+        {"email": "import-existing@example.com", "first_name": "Updated"},
+        {"email": "not-an-email"},
+        {"email": "import-thief@example.com", "username": "import-taken"},
+        {"email": "import-dup-1@example.com", "username": "import-dup"},
+        {"email": "import-dup-2@example.com", "username": "import-dup"},
+    ])
+
+    checkpoint = _import(path, batch_size=10)
+
+    assert (checkpoint.rows_done, checkpoint.inserted, checkpoint.updated, checkpoint.rejected) == (6, 2, 1, 3)
+    assert checkpoint.completed
+    assert _user("import-new@example.com").first_name == "New"
+    existing = _user("import-existing@example.com")
+    assert (existing.first_name, existing.last_name) == ("Updated", "Kept")
+    assert _user("import-thief@example.com") is None
+    assert _user("import-owner@example.com").username == "import-taken"
+
+    with open(f"{path}.rejects.ndjson") as f:
+        rejects = {reject["row"]: reject for reject in map(json.loads, f)}
+    assert sorted(rejects) == [3, 4, 6]
+    assert rejects[3]["errors"][0].startswith("email:")
+    assert rejects[4]["errors"] == ["username or auth0_id belongs to another user"]
+    assert rejects[6]["errors"] == ["username is used by another row in the batch"]
+
+    # Starting over merges nothing new: the merge is idempotent
+    rerun = _import(path, batch_size=10, restart=True)
+    assert (rerun.inserted, rerun.updated, rerun.unchanged, rerun.rejected) == (0, 0, 3, 3)
+
+
+def test_interrupted_import_resumes_after_the_last_checkpoint(tmp_path, monkeypatch):
+    rows = [{"email": f"import-resume-{index}@example.com", "first_name": str(index)} for index in range(5)]
+    path = _write_csv(tmp_path / "resume.csv", rows)
+
+    merged_rows = []
+    stage_and_merge = UserImportService._stage_and_merge
+
+    def crash_on_second_batch(self, staged, checkpoint):
+        if merged_rows:
+            raise RuntimeError("killed")
+        merged_rows.extend(row_number for row_number, _ in staged)
+        return stage_and_merge(self, staged, checkpoint)
+
+    monkeypatch.setattr(UserImportService, "_stage_and_merge", crash_on_second_batch)
+    with pytest.raises(RuntimeError):
+        _import(path, batch_size=2)
+    monkeypatch.undo()
+
+    saved = ImportCheckpoint.load(f"{path}.checkpoint.json")
+    assert (saved.rows_done, saved.inserted, saved.completed) == (2, 2, False)
+
+    resumed_rows = []
+
+    def record(self, staged, checkpoint):
+        resumed_rows.extend(row_number for row_number, _ in staged)
+        return stage_and_merge(self, staged, checkpoint)
+
+    monkeypatch.setattr(UserImportService, "_stage_and_merge", record)
+    checkpoint = _import(path, batch_size=2)
+
+    assert merged_rows == [1, 2]
+    assert resumed_rows == [3, 4, 5]
+    assert (checkpoint.rows_done, checkpoint.inserted, checkpoint.completed) == (5, 5, True)
+    assert all(_user(row["email"]) is not None for row in rows)
+
+
+def test_checkpoint_of_another_file_is_refused(tmp_path):
+    path = _write_csv(tmp_path / "users.csv", [{"email": "import-other@example.com"}])
+    ImportCheckpoint(source=path, source_size=1).save(f"{path}.checkpoint.json")
+
+    with pytest.raises(ValueError, match="different file"):
+        _import(path)
@@ -0,0 +1,79 @@
+from sqlalchemy import text
+from sqlmodel import Session
+
+from src.core.config.database import create_db_and_tables, engine
+from src.models.entities.user import User
+from src.models.requests.user_requests import CreateUserRequest, UpdateUserRequest, UserListFilters
+from src.services import user_statements
+from src.services.user_service import LISTING_INDEXES, UserService
+
+
+def _emails(records):
+    return {record.email for record in records}
+
+
+def test_email_domain_filter_matches_wildcards_literally():
+    create_db_and_tables()
+    with Session(engine) as session:
+        service = UserService(session)
+        service.create_user(CreateUserRequest(email="someone@listing-test.example"))
+        service.create_user(CreateUserRequest(email="other@listingxtest.example"))
+
+        def by_domain(domain):
+            filters = UserListFilters(email_domain=domain)
+            return _emails(service.list_user_records(limit=1000, filters=filters, fields=("email",)))
+
+        assert by_domain("listing-test.example") == {"someone@listing-test.example"}
+        assert by_domain("listingxtest.example") == {"other@listingxtest.example"}
+        # Unescaped, _ and % would match any character(s)
+        assert by_domain("listing_test.example") == set()
+        assert by_domain("%") == set()
+        assert by_domain("listing%") == set()
+
+
+def test_inactive_listing_has_an_index_covering_its_order():
+    create_db_and_tables()
+    with Session(engine) as session:
+        service = UserService(session)
+        user = service.create_user(CreateUserRequest(email="inactive-listing@example.com"))
+        service.update_user(user.id, UpdateUserRequest(is_active=False))
+
+        records = service.list_user_records(limit=1000, filters=UserListFilters(is_active=False))
+        assert "inactive-listing@example.com" in _emails(records)
+
+    name = LISTING_INDEXES[("inactive", False, "updated_at")]
+    index = next(index for index in User.__table__.indexes if index.name == name)
+    statement = user_statements.user_records_page(scope="inactive", sort_column="updated_at")
+
+    assert [column.name for column in index.columns] == ["updated_at", "id"]
+    assert str(index.dialect_options["postgresql"]["where"]) == "NOT is_active"
+    assert 'ORDER BY "user".updated_at, "user".id' in str(statement)
+
+
+def test_active_only_lookups_leave_out_inactive_users():
+    create_db_and_tables()
+    with Session(engine) as session:
+        service = UserService(session)
+        user = service.create_user(CreateUserRequest(email="deactivated@example.com", auth0_id="auth0|deactivated"))
+        service.update_user(user.id, UpdateUserRequest(is_active=False))
+
+        assert service.get_user_by_id(user.id) is None
+        assert service.get_user_by_email("deactivated@example.com") is None
+        assert service.get_user_by_auth0_id("auth0|deactivated") is None
+        assert service.get_user_record_by_id(user.id) is None
+        assert service.get_user_record_by_email("deactivated@example.com") is None
+        assert service.get_user_record_by_auth0_id("auth0|deactivated") is None
+        assert user.id not in {listed.id for listed in service.get_all_users(limit=1000)}
+        assert "deactivated@example.com" not in _emails(service.list_user_records(limit=1000))
+
+        # Still reachable when asked for explicitly
+        assert service.get_user_by_email("deactivated@example.com", include_inactive=True).id == user.id
+        assert service.get_user_record_by_auth0_id("auth0|deactivated", include_inactive=True).id == user.id
+        assert "deactivated@example.com" in _emails(service.list_user_records(limit=1000, include_inactive=True))
+
+        # The active-only lookups are served by partial indexes without inactive rows
+        index_sql = dict(session.exec(text(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND name IN ('ix_user_active_email', 'ix_user_active_auth0_id')"
+        )).all())
+    assert all(sql.endswith("WHERE is_active") for sql in index_sql.values())
+    assert len(index_sql) == 2
@@ -0,0 +1,134 @@
+import anyio
+import httpx
+import pytest
+from fastapi import Depends, Request
+from sqlmodel import Session
+
+from main import app
+from src.core.config.database import create_db_and_tables, engine, get_session
+from src.models.entities.cache_generation import CacheGeneration
+from src.models.entities.user import User
+from src.routes.user_routes import get_user_service
+from src.services.user_service import UserService
+from src.services.user_page_cache import PageCache, TableGeneration, user_generation, user_pages
+
+
+@pytest.fixture
+def shared_generations():
+    create_db_and_tables()
+    user_pages.clear()
+    user_generation.shared = True
+    yield
+    user_generation.shared = False
+    user_pages.clear()
+
+
+async def _get(client, path):
+    response = await client.get(path)
+    assert response.status_code == 200
+    return response
+
+
+def test_user_pages_are_cached_until_a_user_write(shared_generations):
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.post("/users/", json={"email": "cached-1@example.com"})
+
+            first = await _get(client, "/users/?limit=500")
+            second = await _get(client, "/users/?limit=500&include_inactive=false")
+
+            # A write through the API
+            await client.post("/users/", json={"email": "cached-2@example.com"})
+            after_create = await _get(client, "/users/?limit=500")
+
+            # A write from another process (e.g. an import or another worker)
+            with Session(engine) as session:
+                session.execute(
+                    User.__table__.update().where(User.email == "cached-2@example.com").values(first_name="Imported")
+                )
+                TableGeneration("user", shared=True).commit(session)
+            after_external = await _get(client, "/users/?limit=500")
+
+        return first, second, after_create, after_external
+
+    first, second, after_create, after_external = anyio.run(scenario)
+
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.content == first.content
+
+    assert after_create.headers["X-Cache"] == "MISS"
+    assert "cached-2@example.com" in after_create.text
+
+    assert after_external.headers["X-Cache"] == "MISS"
+    assert "Imported" in after_external.text
+
+
+def test_page_cache_evicts_least_recently_used_pages():
+    cache = PageCache("test_lru", max_bytes=10)
+    cache.put("a", 1, b"aaaa")
+    cache.put("b", 1, b"bbbb")
+    assert cache.get("a", 1) == b"aaaa"
+
+    # Over budget: "b" is the least recently used
+    cache.put("c", 1, b"cccc")
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 1) == b"aaaa"
+
+    # Bodies larger than the budget and bodies from an older generation are not stored
+    cache.put("big", 1, b"x" * 11)
+    assert cache.get("big", 1) is None
+    assert cache.get("a", 2) is None
+    cache.put("a", 1, b"aaaa")
+    assert cache.get("a", 2) is None
+    assert cache.snapshot()["evictions"] == 1
+
+
+def test_a_reader_with_an_older_generation_misses_without_wiping_the_cache():
+    cache = PageCache("test_older_generation", max_bytes=100)
+    cache.put("page-1", 2, b"new")
+
+    # Read the generation just before a concurrent bump
+    assert cache.get("page-1", 1) is None
+    cache.put("page-1", 1, b"old")
+
+    assert cache.get("page-1", 2) == b"new"
+    assert cache.snapshot()["invalidations"] == 0
+
+
+def test_shared_generation_bump_creates_the_missing_counter_row():
+    create_db_and_tables()
+    generation = TableGeneration("test_table", shared=True)
+    with Session(engine) as session:
+        session.execute(CacheGeneration.__table__.delete().where(CacheGeneration.name == "test_table"))
+        session.commit()
+
+        generation.commit(session)
+        generation.commit(session)
+
+        assert generation.current(session) == 2
+
+
+def test_cache_hits_do_not_hold_a_connection(shared_generations):
+    checked_out_after_handler = []
+
+    def probing_user_service(request: Request, db: Session = Depends(get_session)):
+        yield UserService(db, release_connections=True)
+        # Runs after the handler, before the request's session is closed
+        checked_out_after_handler.append(engine.pool.checkedout())
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await _get(client, "/users/?limit=5")
+            return await _get(client, "/users/?limit=5")
+
+    app.dependency_overrides[get_user_service] = probing_user_service
+    try:
+        hit = anyio.run(scenario)
+    finally:
+        del app.dependency_overrides[get_user_service]
+
+    assert hit.headers["X-Cache"] == "HIT"
+    assert checked_out_after_handler[-1] == 0
@@ -0,0 +1,173 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import anyio
+import httpx
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session
+
+from main import app
+from src.core.config.database import create_db_and_tables, engine
+from src.core.metrics import metrics
+from src.models.entities.user import User
+from src.services.user_write_behind import UserWriteBehind, postgres_batch_update
+
+LOGGED_IN_AT = datetime(2030, 1, 1)
+
+
+@pytest.fixture
+def users():
+    create_db_and_tables()
+    created = [User(email=f"write-behind-{index}-{datetime.utcnow().timestamp()}@example.com") for index in range(3)]
+    with Session(engine) as session:
+        for user in created:
+            session.add(user)
+        session.commit()
+        return [user.id for user in created]
+
+
+@pytest.fixture
+def writer():
+    # Only flushes when told to (or when stopped)
+    writer = UserWriteBehind(engine, flush_size=2, flush_interval=60, max_pending=2, enqueue_timeout=0.05)
+    writer.start()
+    yield writer
+    writer.stop()
+
+
+def _last_login(user_id):
+    with Session(engine) as session:
+        return session.get(User, user_id).last_login
+
+
+def _transient_error():
+    return OperationalError("UPDATE user", {}, Exception("server closed the connection unexpectedly"))
+
+
+def test_repeated_updates_to_a_user_coalesce_into_the_newest(writer, users):
+    user_id = users[0]
+    assert writer.enqueue(user_id, last_login=LOGGED_IN_AT)
+    assert writer.enqueue(user_id, last_login=LOGGED_IN_AT + timedelta(hours=1))
+    # Arrived late but is older; doesn't win
+    assert writer.enqueue(user_id, last_login=LOGGED_IN_AT - timedelta(hours=1))
+
+    assert writer.snapshot()["pending"] == 1
+    assert writer.snapshot()["coalesced"] == 2
+    assert writer.flush() == 1
+    assert _last_login(user_id) == LOGGED_IN_AT + timedelta(hours=1)
+
+
+def test_full_buffer_rejects_new_users_but_coalesces_pending_ones(monkeypatch, users):
+    writer = UserWriteBehind(engine, flush_size=2, flush_interval=60, max_pending=2, enqueue_timeout=0.05)
+    # The writer thread can't drain the buffer
+    monkeypatch.setattr(writer, "flush", lambda: 0)
+    writer.start()
+    try:
+        assert writer.enqueue(users[0], last_login=LOGGED_IN_AT)
+        assert writer.enqueue(users[1], last_login=LOGGED_IN_AT)
+        # The caller has to write this one itself
+        assert not writer.enqueue(users[2], last_login=LOGGED_IN_AT)
+        assert writer.enqueue(users[0], last_login=LOGGED_IN_AT + timedelta(hours=1))
+        assert writer.snapshot()["rejected"] == 1
+    finally:
+        monkeypatch.undo()
+        writer.stop()
+
+    assert _last_login(users[0]) == LOGGED_IN_AT + timedelta(hours=1)
+    assert _last_login(users[2]) is None
+
+
+def test_stop_flushes_pending_updates_and_rejects_new_ones(writer, users):
+    assert writer.enqueue(users[0], last_login=LOGGED_IN_AT)
+
+    writer.stop()
+
+    assert _last_login(users[0]) == LOGGED_IN_AT
+    assert writer.snapshot()["pending"] == 0
+    assert not writer.enqueue(users[1], last_login=LOGGED_IN_AT)
+
+
+def test_transient_flush_failure_is_retried_once_with_newer_values_kept(writer, users, monkeypatch):
+    write = writer._write
+    failures = []
+
+    def fail_once(chunk):
+        if not failures:
+            failures.append(chunk)
+            raise _transient_error()
+        write(chunk)
+
+    monkeypatch.setattr(writer, "_write", fail_once)
+    writer.enqueue(users[0], last_login=LOGGED_IN_AT)
+    assert writer.flush() == 0
+    # A newer update merges with the one put back
+    writer.enqueue(users[0], last_login=LOGGED_IN_AT + timedelta(hours=1))
+
+    assert writer.snapshot()["requeued"] == 1
+    assert writer.flush() == 1
+    assert _last_login(users[0]) == LOGGED_IN_AT + timedelta(hours=1)
+
+
+def test_batch_is_dropped_after_its_retry_fails(writer, users, monkeypatch):
+    def always_fail(chunk):
+        raise _transient_error()
+
+    monkeypatch.setattr(writer, "_write", always_fail)
+    writer.enqueue(users[0], last_login=LOGGED_IN_AT)
+    writer.flush()
+    writer.flush()
+
+    snapshot = writer.snapshot()
+    assert (snapshot["pending"], snapshot["requeued"], snapshot["dropped"], snapshot["flush_errors"]) == (0, 1, 1, 2)
+    assert _last_login(users[0]) is None
+
+
+def test_postgres_batch_is_one_update_from_values():
+    """Compiled only; the suite runs on SQLite"""
+    first, second = uuid4(), uuid4()
+    statement = postgres_batch_update([(first, LOGGED_IN_AT), (second, None)], LOGGED_IN_AT)
+
+    sql = " ".join(str(statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})).split())
+
+    assert sql.startswith('UPDATE "user" SET')
+    assert f"FROM (VALUES ('{first}', '2030-01-01 00:00:00'), ('{second}', NULL)) AS batch (id, last_login)" in sql
+    # An older or missing value never overwrites a newer login
+    assert 'last_login=greatest("user".last_login, CAST(batch.last_login AS TIMESTAMP WITHOUT TIME ZONE))' in sql
+    assert sql.endswith('WHERE "user".id = CAST(batch.id AS UUID)')
+
+
+def _post_login(user_id):
+    async def post():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(f"/users/{user_id}/login")
+
+    return anyio.run(post)
+
+
+def test_queued_login_needs_no_connection(users, monkeypatch):
+    writer = UserWriteBehind(engine, flush_size=10, flush_interval=60, max_pending=10)
+    writer.start()
+    monkeypatch.setattr(app.state, "user_write_behind", writer, raising=False)
+    checkouts = metrics.snapshot()["db_pool"]["checkouts"]
+    try:
+        known = _post_login(users[0])
+        # Unknown ids are accepted; their flush updates no row
+        unknown = _post_login(uuid4())
+        assert metrics.snapshot()["db_pool"]["checkouts"] == checkouts
+    finally:
+        writer.stop()
+
+    assert (known.status_code, unknown.status_code) == (202, 202)
+    assert writer.snapshot()["flushed_rows"] == 2
+    assert _last_login(users[0]) is not None
+
+
+def test_synchronous_login_for_an_unknown_user_is_404(users, monkeypatch):
+    monkeypatch.setattr(app.state, "user_write_behind", None, raising=False)
+
+    assert _post_login(uuid4()).status_code == 404
+    assert _post_login(users[0]).status_code == 202
+    assert _last_login(users[0]) is not None